@@ -13,7 +13,8 @@ from database import Base, DATABASE_URL  # noqa: E402
 config = context.config
 config.set_main_option("sqlalchemy.url", DATABASE_URL)
 
-if config.config_file_name is not None:
+# migrate.py configures logging itself; fileConfig would disable its "snug-api" logger
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
     fileConfig(config.config_file_name)
 
 target_metadata = Base.metadata
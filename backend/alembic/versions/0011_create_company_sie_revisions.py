@@ -0,0 +1,52 @@
+"""company sie revisions (append-only history)
+
+Revision ID: 0011_create_company_sie_revisions
+Revises: 0010_company_lock_takeover_requests
+Create Date: 2026-03-10
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0011_create_company_sie_revisions"
+down_revision = "0010_company_lock_takeover_requests"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "company_sie_revisions",
+        sa.Column("id", sa.Integer(), primary_key=True, nullable=False),
+        sa.Column("company_id", sa.Integer(), sa.ForeignKey("companies.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.String(length=10), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("created_by_user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.text("NOW()")),
+        sa.UniqueConstraint("company_id", "version", name="uq_company_sie_revisions_company_version"),
+    )
+    op.create_index("ix_company_sie_revisions_id", "company_sie_revisions", ["id"], unique=False)
+    op.create_index(
+        "ix_company_sie_revisions_company_kind_version",
+        "company_sie_revisions",
+        ["company_id", "kind", "version"],
+        unique=False,
+    )
+
+    # Seed history with the current state of every company as a snapshot,
+    # so the next save can be stored as a delta.
+    op.execute(
+        """
+        INSERT INTO company_sie_revisions (company_id, version, kind, content, created_by_user_id, created_at)
+        SELECT company_id, version, 'SNAPSHOT', sie_content, updated_by_user_id, COALESCE(updated_at, NOW())
+        FROM company_sie_states;
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_company_sie_revisions_company_kind_version", table_name="company_sie_revisions")
+    op.drop_index("ix_company_sie_revisions_id", table_name="company_sie_revisions")
+    op.drop_table("company_sie_revisions")
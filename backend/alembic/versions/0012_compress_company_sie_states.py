@@ -0,0 +1,101 @@
+"""compressed storage for company_sie_states
+
+Revision ID: 0012_compress_company_sie_states
+Revises: 0011_create_company_sie_revisions
+Create Date: 2026-03-12
+"""
+
+import gzip
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0012_compress_company_sie_states"
+down_revision = "0011_create_company_sie_revisions"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 200
+
+
+# Inlined rather than imported from sie.py so later changes there can't alter this
+# migration. Same bytes as sie.compress_sie_content(content, "gzip") at the time.
+def _gzip(content: str) -> bytes:
+    return gzip.compress(content.encode("utf-8"), compresslevel=6, mtime=0)
+
+
+def _decompress(data: bytes, codec: str) -> str:
+    data = bytes(data)
+    if codec == "gzip":
+        data = gzip.decompress(data)
+    elif codec != "none":
+        raise ValueError(f"Unknown SIE codec: {codec}")
+    return data.decode("utf-8")
+
+
+def upgrade() -> None:
+    op.add_column("company_sie_states", sa.Column("sie_content_compressed", sa.LargeBinary(), nullable=True))
+    op.add_column("company_sie_states", sa.Column("sie_content_codec", sa.String(length=10), nullable=True))
+    op.alter_column("company_sie_states", "sie_content", existing_type=sa.Text(), nullable=True)
+
+    # Backfill in batches so we never hold every SIE file in memory at once.
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.text(
+                """
+                SELECT id, sie_content FROM company_sie_states
+                WHERE id > :last_id AND sie_content IS NOT NULL
+                ORDER BY id
+                LIMIT :limit
+                """
+            ),
+            {"last_id": last_id, "limit": BATCH_SIZE},
+        ).fetchall()
+        if not rows:
+            break
+        conn.execute(
+            sa.text(
+                """
+                UPDATE company_sie_states
+                SET sie_content_compressed = :data, sie_content_codec = 'gzip', sie_content = NULL
+                WHERE id = :id
+                """
+            ),
+            [{"id": row.id, "data": _gzip(row.sie_content)} for row in rows],
+        )
+        last_id = rows[-1].id
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.text(
+                """
+                SELECT id, sie_content_compressed, sie_content_codec FROM company_sie_states
+                WHERE id > :last_id AND sie_content_compressed IS NOT NULL
+                ORDER BY id
+                LIMIT :limit
+                """
+            ),
+            {"last_id": last_id, "limit": BATCH_SIZE},
+        ).fetchall()
+        if not rows:
+            break
+        conn.execute(
+            sa.text("UPDATE company_sie_states SET sie_content = :content WHERE id = :id"),
+            [
+                {"id": row.id, "content": _decompress(row.sie_content_compressed, row.sie_content_codec)}
+                for row in rows
+            ],
+        )
+        last_id = rows[-1].id
+
+    op.execute("UPDATE company_sie_states SET sie_content = '' WHERE sie_content IS NULL")
+    op.alter_column("company_sie_states", "sie_content", existing_type=sa.Text(), nullable=False)
+    op.drop_column("company_sie_states", "sie_content_codec")
+    op.drop_column("company_sie_states", "sie_content_compressed")
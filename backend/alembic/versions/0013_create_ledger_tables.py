@@ -0,0 +1,79 @@
+"""normalized ledger tables (vouchers, transactions, account_balances)
+
+Revision ID: 0013_create_ledger_tables
+Revises: 0012_compress_company_sie_states
+Create Date: 2026-03-16
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0013_create_ledger_tables"
+down_revision = "0012_compress_company_sie_states"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "vouchers",
+        sa.Column("id", sa.Integer(), primary_key=True, nullable=False),
+        sa.Column("company_id", sa.Integer(), sa.ForeignKey("companies.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("series", sa.String(length=20), nullable=False),
+        sa.Column("number", sa.String(length=20), nullable=False),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("text", sa.Text(), nullable=True),
+        sa.UniqueConstraint("company_id", "series", "number", name="uq_vouchers_company_series_number"),
+    )
+    op.create_index("ix_vouchers_id", "vouchers", ["id"], unique=False)
+    op.create_index("ix_vouchers_company_date", "vouchers", ["company_id", "date"], unique=False)
+
+    op.create_table(
+        "transactions",
+        sa.Column("id", sa.Integer(), primary_key=True, nullable=False),
+        sa.Column("company_id", sa.Integer(), sa.ForeignKey("companies.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("voucher_id", sa.Integer(), sa.ForeignKey("vouchers.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("line_no", sa.Integer(), nullable=False),
+        sa.Column("account", sa.String(length=20), nullable=False),
+        sa.Column("amount", sa.Numeric(18, 2), nullable=False),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("objects", sa.Text(), nullable=True),
+        sa.Column("text", sa.Text(), nullable=True),
+    )
+    op.create_index("ix_transactions_id", "transactions", ["id"], unique=False)
+    op.create_index("ix_transactions_company_account_date", "transactions", ["company_id", "account", "date"], unique=False)
+    op.create_index("ix_transactions_voucher_id", "transactions", ["voucher_id"], unique=False)
+
+    op.create_table(
+        "account_balances",
+        sa.Column("id", sa.Integer(), primary_key=True, nullable=False),
+        sa.Column("company_id", sa.Integer(), sa.ForeignKey("companies.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("account", sa.String(length=20), nullable=False),
+        sa.Column("kind", sa.String(length=10), nullable=False),
+        sa.Column("period", sa.Date(), nullable=False),
+        sa.Column("amount", sa.Numeric(18, 2), nullable=False),
+        sa.UniqueConstraint(
+            "company_id", "account", "kind", "period", name="uq_account_balances_company_account_kind_period"
+        ),
+    )
+    op.create_index("ix_account_balances_id", "account_balances", ["id"], unique=False)
+    op.create_index(
+        "ix_account_balances_company_account_period",
+        "account_balances",
+        ["company_id", "account", "period"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_account_balances_company_account_period", table_name="account_balances")
+    op.drop_index("ix_account_balances_id", table_name="account_balances")
+    op.drop_table("account_balances")
+    op.drop_index("ix_transactions_voucher_id", table_name="transactions")
+    op.drop_index("ix_transactions_company_account_date", table_name="transactions")
+    op.drop_index("ix_transactions_id", table_name="transactions")
+    op.drop_table("transactions")
+    op.drop_index("ix_vouchers_company_date", table_name="vouchers")
+    op.drop_index("ix_vouchers_id", table_name="vouchers")
+    op.drop_table("vouchers")
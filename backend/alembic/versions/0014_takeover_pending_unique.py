@@ -0,0 +1,50 @@
+"""only one PENDING takeover request per (company, user)
+
+uq_takeover_company_user_status allowed a single APPROVED/REJECTED/EXPIRED row
+per user and company, so a second decision on the same pair failed. Only
+pending requests need to be unique.
+
+Revision ID: 0014_takeover_pending_unique
+Revises: 0013_create_ledger_tables
+Create Date: 2026-03-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0014_takeover_pending_unique"
+down_revision = "0013_create_ledger_tables"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.drop_constraint("uq_takeover_company_user_status", "company_lock_takeover_requests", type_="unique")
+    op.create_index(
+        "uq_takeover_company_user_pending",
+        "company_lock_takeover_requests",
+        ["company_id", "requested_by_user_id"],
+        unique=True,
+        postgresql_where=sa.text("status = 'PENDING'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uq_takeover_company_user_pending", table_name="company_lock_takeover_requests")
+    # keep the newest row per (company, user, status) so the old constraint can be restored
+    op.execute(
+        """
+        DELETE FROM company_lock_takeover_requests t
+        USING company_lock_takeover_requests newer
+        WHERE t.company_id = newer.company_id
+          AND t.requested_by_user_id = newer.requested_by_user_id
+          AND t.status = newer.status
+          AND t.id < newer.id
+        """
+    )
+    op.create_unique_constraint(
+        "uq_takeover_company_user_status",
+        "company_lock_takeover_requests",
+        ["company_id", "requested_by_user_id", "status"],
+    )
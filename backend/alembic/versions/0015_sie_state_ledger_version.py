@@ -0,0 +1,27 @@
+"""company_sie_states.ledger_version
+
+Records which SIE state version the ledger tables were last synced to, so an
+incremental sync only runs against tables known to mirror the previous content.
+Existing rows start as NULL and are rebuilt on their next save.
+
+Revision ID: 0015_sie_state_ledger_version
+Revises: 0014_takeover_pending_unique
+Create Date: 2026-03-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0015_sie_state_ledger_version"
+down_revision = "0014_takeover_pending_unique"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("company_sie_states", sa.Column("ledger_version", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("company_sie_states", "ledger_version")
@@ -0,0 +1,41 @@
+"""fiscal_years: #RAR years of the company SIE state
+
+Lets ledger queries bound "this fiscal year" by the real year start instead of an
+opening balance row, which result accounts don't have. Ledger tables built before
+this revision have no years, so ledger_version is reset and the next save of each
+company rebuilds them.
+
+Revision ID: 0016_create_fiscal_years
+Revises: 0015_sie_state_ledger_version
+Create Date: 2026-03-21
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0016_create_fiscal_years"
+down_revision = "0015_sie_state_ledger_version"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "fiscal_years",
+        sa.Column("id", sa.Integer(), primary_key=True, nullable=False),
+        sa.Column("company_id", sa.Integer(), sa.ForeignKey("companies.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("year", sa.Integer(), nullable=False),
+        sa.Column("start_date", sa.Date(), nullable=False),
+        sa.Column("end_date", sa.Date(), nullable=False),
+        sa.UniqueConstraint("company_id", "year", name="uq_fiscal_years_company_year"),
+    )
+    op.create_index("ix_fiscal_years_id", "fiscal_years", ["id"], unique=False)
+    op.create_index("ix_fiscal_years_company_start_date", "fiscal_years", ["company_id", "start_date"], unique=False)
+    op.execute("UPDATE company_sie_states SET ledger_version = NULL")
+
+
+def downgrade() -> None:
+    op.drop_index("ix_fiscal_years_company_start_date", table_name="fiscal_years")
+    op.drop_index("ix_fiscal_years_id", table_name="fiscal_years")
+    op.drop_table("fiscal_years")
@@ -1,19 +1,73 @@
+import importlib.util
 import os
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
+from db_pool import instrument_pool, pool_options
+
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://snug:snug@db:5432/snug_ledger")
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+# pool settings (DB_POOL_* env, see db_pool.py) apply to Postgres; sqlite keeps its defaults
+_IS_POSTGRES = make_url(DATABASE_URL).get_backend_name() == "postgresql"
+
+engine = create_engine(DATABASE_URL, **(pool_options() if _IS_POSTGRES else {"pool_pre_ping": True}))
+instrument_pool(engine, "sync")
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# Postgres advisory locks, taken with the two-int form pg_*advisory*lock(namespace, id).
+# Every lock the app takes gets its own id here, so no two features can share a key.
+ADVISORY_LOCK_NAMESPACE = 0x736E7567  # "snug"
+SWEEP_ADVISORY_LOCK = (ADVISORY_LOCK_NAMESPACE, 1)
+MIGRATION_ADVISORY_LOCK = (ADVISORY_LOCK_NAMESPACE, 2)
+
+
+def _async_url(url: str) -> str:
+    # same database through an asyncio driver: postgresql -> asyncpg, sqlite -> aiosqlite
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    driver = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}.get(backend)
+    if driver is None:
+        raise RuntimeError(f"No async driver configured for {backend}; set ASYNC_DATABASE_URL")
+    if importlib.util.find_spec(driver) is None:
+        raise RuntimeError(f"DATABASE_URL is {backend}, which needs the {driver} driver: pip install {driver}")
+    return parsed.set(drivername=f"{backend}+{driver}").render_as_string(hide_password=False)
+
+
+# Async engine for the small, frequent endpoints (locks, heartbeats, takeover polling,
+# sie-state reads). Everything else still uses the sync engine above.
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _async_url(DATABASE_URL)
+
+# DB_POOL_PRE_PING=always is costlier here: asyncpg's ping is BEGIN + ";" + ROLLBACK
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **(pool_options(asyncio=True) if _IS_POSTGRES else {}))
+instrument_pool(async_engine.sync_engine, "async")
+
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Read-only polling endpoints run each SELECT in autocommit (same pool): asyncpg would
+# otherwise spend a round trip on BEGIN and another on ROLLBACK per request.
+AsyncReadSessionLocal = async_sessionmaker(
+    async_engine.execution_options(isolation_level="AUTOCOMMIT"), autoflush=False, expire_on_commit=False
+)
+
 
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
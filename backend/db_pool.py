@@ -0,0 +1,124 @@
+"""
+Connection pool settings and metrics for the Postgres engines in database.py.
+
+Both engines (sync and async) get their own pool per worker process, sized by:
+
+    DB_POOL_SIZE             connections kept open (default 5)
+    DB_MAX_OVERFLOW          extra connections opened under load (default 10)
+    DB_POOL_TIMEOUT          seconds to wait for a free connection before
+                             "QueuePool limit ... reached" (default 30)
+    DB_POOL_RECYCLE          replace connections older than this many seconds
+                             (default 1800, -1 disables)
+    DB_POOL_PRE_PING         when to test a connection on checkout:
+                               always - every checkout (one extra round trip per request)
+                               idle   - only if it sat unused for DB_POOL_PRE_PING_IDLE_SECONDS
+                                        (default 30); default
+                               never  - rely on recycle; a dead connection fails one request
+
+Pool size, checked-out and overflow connections, checkout wait time and timeouts
+are exported per pool ("sync"/"async") at GET /metrics.
+"""
+
+import logging
+import os
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from metrics import Counter, Gauge, Histogram
+
+logger = logging.getLogger("snug-api")
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "idle").strip().lower()
+DB_POOL_PRE_PING_IDLE_SECONDS = float(os.getenv("DB_POOL_PRE_PING_IDLE_SECONDS", "30"))
+
+PRE_PING_STRATEGIES = ("always", "idle", "never")
+if DB_POOL_PRE_PING not in PRE_PING_STRATEGIES:
+    raise RuntimeError(f"DB_POOL_PRE_PING must be one of {PRE_PING_STRATEGIES}")
+
+DB_POOL_SIZE_GAUGE = Gauge("snug_db_pool_size", "Configured pool size", ("pool",))
+DB_POOL_CHECKED_OUT = Gauge("snug_db_pool_checked_out", "Connections currently checked out", ("pool",))
+DB_POOL_OVERFLOW = Gauge("snug_db_pool_overflow", "Connections open beyond the pool size", ("pool",))
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "snug_db_pool_checkout_seconds",
+    "Time to get a connection from the pool (waiting and/or connecting)",
+    ("pool",),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+DB_POOL_TIMEOUTS = Counter("snug_db_pool_timeouts_total", "Checkouts that hit DB_POOL_TIMEOUT", ("pool",))
+
+
+class _TimedPoolMixin:
+    # set by instrument_pool(); used as the "pool" metric label
+    metrics_name = "sync"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            DB_POOL_TIMEOUTS.inc(pool=self.metrics_name)
+            logger.warning("DB pool %s exhausted: %s", self.metrics_name, self.status())
+            raise
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - started, pool=self.metrics_name)
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_options(asyncio: bool = False) -> dict:
+    """create_engine()/create_async_engine() keyword arguments for a Postgres engine."""
+    return {
+        "poolclass": TimedAsyncAdaptedQueuePool if asyncio else TimedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING == "always",
+    }
+
+
+def _ping_idle_connections(engine, idle_seconds: float) -> None:
+    dialect = engine.dialect
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        connection_record.info["checked_in_at"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        checked_in_at = connection_record.info.get("checked_in_at")
+        if checked_in_at is None or time.monotonic() - checked_in_at < idle_seconds:
+            return
+        try:
+            dialect.do_ping(dbapi_connection)
+        except dialect.loaded_dbapi.Error as err:
+            if dialect.is_disconnect(err, dbapi_connection, None):
+                # the pool discards this connection and retries with a fresh one
+                raise exc.DisconnectionError() from err
+            raise
+
+
+def instrument_pool(engine, name: str) -> None:
+    """Label the engine's pool for metrics and apply the idle pre-ping strategy."""
+    pool = engine.pool
+    if not isinstance(pool, _TimedPoolMixin):
+        return
+    pool.metrics_name = name
+    DB_POOL_SIZE_GAUGE.set_function(pool.size, pool=name)
+    DB_POOL_CHECKED_OUT.set_function(pool.checkedout, pool=name)
+    # QueuePool.overflow() counts from -pool_size until the pool is full
+    DB_POOL_OVERFLOW.set_function(lambda: max(0, pool.overflow()), pool=name)
+    if DB_POOL_PRE_PING == "idle":
+        _ping_idle_connections(engine, DB_POOL_PRE_PING_IDLE_SECONDS)
@@ -0,0 +1,167 @@
+"""
+Per-company server-sent events (lock changes, takeover requests).
+
+Handlers call publish_company_event(db, ...) (or publish_company_event_async) before committing:
+- On Postgres the event goes out with pg_notify inside the caller's transaction,
+  so it is only delivered if the transaction commits, and every uvicorn worker
+  receives it through its LISTEN thread.
+- On other databases (local dev) it is queued on the session and handed to the
+  in-process broker after commit.
+
+SSE endpoints subscribe to the broker and get one asyncio.Queue per client.
+"""
+
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from collections import defaultdict
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger("snug-api")
+
+NOTIFY_CHANNEL = "company_events"
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+def format_sse(event_name: str, data: dict) -> str:
+    return f"event: {event_name}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class CompanyEventBroker:
+    """In-process fan-out from publishers (any thread) to SSE subscribers (event loop)."""
+
+    def __init__(self):
+        self._subscribers: dict[int, set[asyncio.Queue]] = defaultdict(set)
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def subscribe(self, company_id: int) -> asyncio.Queue:
+        # must be called from the event loop
+        self._loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers[company_id].add(queue)
+        return queue
+
+    def unsubscribe(self, company_id: int, queue: asyncio.Queue) -> None:
+        subscribers = self._subscribers.get(company_id)
+        if not subscribers:
+            return
+        subscribers.discard(queue)
+        if not subscribers:
+            self._subscribers.pop(company_id, None)
+
+    def dispatch(self, company_id: int, message: str) -> None:
+        """Thread-safe: hand a formatted SSE message to the loop for delivery."""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(self._deliver, company_id, message)
+
+    def _deliver(self, company_id: int, message: str) -> None:
+        for queue in list(self._subscribers.get(company_id, ())):
+            if queue.full():
+                # slow client: drop its oldest message rather than block everyone
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+
+broker = CompanyEventBroker()
+
+
+# ------------------------------------------------------------
+# Publishing
+# ------------------------------------------------------------
+def _notify(db: Session | AsyncSession, company_id: int, event_name: str, data: dict):
+    """(statement, params) for Postgres, or None after queueing the event on the session."""
+    payload = {"companyId": company_id, "event": event_name, "data": data}
+    if db.get_bind().dialect.name == "postgresql":
+        return (
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": NOTIFY_CHANNEL, "payload": json.dumps(payload, separators=(",", ":"))},
+        )
+    db.info.setdefault("pending_company_events", []).append(payload)
+    return None
+
+
+def publish_company_event(db: Session, company_id: int, event_name: str, data: dict) -> None:
+    notify = _notify(db, company_id, event_name, data)
+    if notify:
+        db.execute(*notify)
+
+
+async def publish_company_event_async(db: AsyncSession, company_id: int, event_name: str, data: dict) -> None:
+    # AsyncSession commits through its sync Session, so the after_commit hook below applies too
+    notify = _notify(db, company_id, event_name, data)
+    if notify:
+        await db.execute(*notify)
+
+
+@event.listens_for(Session, "after_commit")
+def _flush_pending_events(session: Session) -> None:
+    for payload in session.info.pop("pending_company_events", ()):
+        _dispatch_payload(payload)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending_events(session: Session) -> None:
+    session.info.pop("pending_company_events", None)
+
+
+def _dispatch_payload(payload: dict) -> None:
+    data = dict(payload["data"], companyId=payload["companyId"])
+    broker.dispatch(int(payload["companyId"]), format_sse(payload["event"], data))
+
+
+# ------------------------------------------------------------
+# Postgres LISTEN (one thread per worker process)
+# ------------------------------------------------------------
+class PostgresEventListener:
+    def __init__(self, database_url: str):
+        self._dsn = make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="company-events-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        import psycopg2
+        import psycopg2.extensions
+
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(self._dsn)
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {NOTIFY_CHANNEL};")
+                logger.info("Listening for company events on '%s'.", NOTIFY_CHANNEL)
+                while not self._stop.is_set():
+                    if select.select([conn], [], [], 5) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        try:
+                            _dispatch_payload(json.loads(notify.payload))
+                        except (ValueError, KeyError):
+                            logger.warning("Ignoring malformed company event: %s", notify.payload)
+            except Exception:
+                logger.exception("Company event listener failed; reconnecting.")
+                time.sleep(2)
+            finally:
+                if conn is not None:
+                    conn.close()
@@ -0,0 +1,281 @@
+"""
+Mirror of the company SIE state in relational tables (vouchers, transactions,
+account_balances, fiscal_years). Written in the same transaction as CompanySIEState.
+
+Saves are applied incrementally: the previous and new SIE content are split into
+voucher blocks (series + number) and compared as text. Only blocks that differ are
+parsed, only those vouchers are rewritten, and their movements are applied to the
+balance rows as deltas, so the database work scales with the number of changed
+vouchers. A month whose movements net to zero has no MOVEMENT row.
+"""
+
+import logging
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from sqlalchemy import delete, insert, select, tuple_
+from sqlalchemy.orm import Session
+
+from models import LedgerAccountBalance, LedgerFiscalYear, LedgerTransaction, LedgerVoucher
+from sie import SIELedger, SIEVoucher, iter_voucher_blocks, parse_sie_ledger, split_sie_lines
+
+logger = logging.getLogger("snug-api")
+
+def _month_start(value):
+    return value.replace(day=1)
+
+
+def _unique_vouchers(company_id: int, ledger: SIELedger) -> dict[tuple[str, str], SIEVoucher]:
+    # series+number is the key (unique in the vouchers table); if a file repeats a
+    # voucher only the last one is mirrored, so say so instead of diverging silently
+    vouchers = {v.key: v for v in ledger.vouchers}
+    if len(vouchers) != len(ledger.vouchers):
+        repeated = [key for key, count in Counter(v.key for v in ledger.vouchers).items() if count > 1]
+        logger.warning(
+            "Company %s: SIE file repeats voucher(s) %s; only the last of each is in the ledger tables",
+            company_id,
+            ", ".join(f"{series} {number}" for series, number in repeated[:20]),
+        )
+    return vouchers
+
+
+def _opening_balance_rows(company_id: int, ledger: SIELedger) -> list[dict]:
+    rows = []
+    for (year, account), amount in ledger.opening_balances.items():
+        if year not in ledger.years:
+            continue
+        rows.append(
+            {
+                "company_id": company_id,
+                "account": account,
+                "kind": "IB",
+                "period": ledger.years[year][0],
+                "amount": amount,
+            }
+        )
+    return rows
+
+
+def _opening_balances(company_id: int, ledger: SIELedger) -> dict[tuple[str, object], Decimal]:
+    rows = _opening_balance_rows(company_id, ledger)
+    return {(row["account"], row["period"]): row["amount"] for row in rows}
+
+
+def _replace_fiscal_years(db: Session, company_id: int, ledger: SIELedger) -> None:
+    db.execute(delete(LedgerFiscalYear).where(LedgerFiscalYear.company_id == company_id))
+    if ledger.years:
+        db.execute(
+            insert(LedgerFiscalYear),
+            [
+                {"company_id": company_id, "year": year, "start_date": start, "end_date": end}
+                for year, (start, end) in ledger.years.items()
+            ],
+        )
+
+
+def _movements(vouchers) -> dict[tuple[str, object], Decimal]:
+    totals: dict[tuple[str, object], Decimal] = defaultdict(Decimal)
+    for voucher in vouchers:
+        for trans in voucher.transactions:
+            totals[(trans.account, _month_start(trans.date or voucher.date))] += trans.amount
+    return totals
+
+
+def _insert_vouchers(db: Session, company_id: int, vouchers: list[SIEVoucher]) -> None:
+    if not vouchers:
+        return
+    ids = db.execute(
+        insert(LedgerVoucher).returning(LedgerVoucher.id, sort_by_parameter_order=True),
+        [
+            {"company_id": company_id, "series": v.series, "number": v.number, "date": v.date, "text": v.text}
+            for v in vouchers
+        ],
+    ).scalars().all()
+
+    trans_rows = [
+        {
+            "company_id": company_id,
+            "voucher_id": voucher_id,
+            "line_no": line_no,
+            "account": t.account,
+            "amount": t.amount,
+            "date": t.date or v.date,
+            "objects": t.objects,
+            "text": t.text,
+        }
+        for voucher_id, v in zip(ids, vouchers)
+        for line_no, t in enumerate(v.transactions)
+    ]
+    if trans_rows:
+        db.execute(insert(LedgerTransaction), trans_rows)
+
+
+def rebuild_company_ledger(db: Session, company_id: int, content: str) -> None:
+    """
+    Replace the company's ledger rows with what `content` contains.
+    Caller commits.
+    """
+    ledger = parse_sie_ledger(content)
+    vouchers = list(_unique_vouchers(company_id, ledger).values())
+
+    db.execute(delete(LedgerAccountBalance).where(LedgerAccountBalance.company_id == company_id))
+    db.execute(delete(LedgerTransaction).where(LedgerTransaction.company_id == company_id))
+    db.execute(delete(LedgerVoucher).where(LedgerVoucher.company_id == company_id))
+
+    _insert_vouchers(db, company_id, vouchers)
+    _replace_fiscal_years(db, company_id, ledger)
+
+    balance_rows = _opening_balance_rows(company_id, ledger)
+    balance_rows.extend(
+        {"company_id": company_id, "account": account, "kind": "MOVEMENT", "period": period, "amount": amount}
+        for (account, period), amount in _movements(vouchers).items()
+        if amount
+    )
+    if balance_rows:
+        db.execute(insert(LedgerAccountBalance), balance_rows)
+
+
+# If more than this share of vouchers changed, a full rebuild is cheaper than
+# targeted deletes/inserts.
+FULL_REBUILD_RATIO = 0.5
+
+
+def _split_vouchers(content: str) -> tuple[dict[tuple[str, str], tuple[str, ...]], list[str]] | None:
+    """
+    Voucher blocks by (series, number) and all lines outside them, without parsing
+    the vouchers. None if the file repeats a voucher (left to the full rebuild).
+    """
+    lines = split_sie_lines(content).lines
+    blocks: dict[tuple[str, str], tuple[str, ...]] = {}
+    other: list[str] = []
+    pos = 0
+    for key, start, end in iter_voucher_blocks(lines):
+        if key in blocks:
+            return None
+        other.extend(lines[pos:start])
+        blocks[key] = tuple(lines[start:end])
+        pos = end
+    other.extend(lines[pos:])
+    return blocks, other
+
+
+def _parse_blocks(blocks) -> dict[tuple[str, str], SIEVoucher]:
+    # blocks that don't parse into a voucher (bad date, ...) aren't mirrored either
+    ledger = parse_sie_ledger("\n".join(line for block in blocks for line in block))
+    return {v.key: v for v in ledger.vouchers}
+
+
+def _delete_vouchers(db: Session, company_id: int, keys: list[tuple[str, str]]) -> int:
+    """Delete these vouchers and their transactions; returns how many vouchers were found."""
+    if not keys:
+        return 0
+    ids = db.execute(
+        select(LedgerVoucher.id).where(
+            LedgerVoucher.company_id == company_id,
+            tuple_(LedgerVoucher.series, LedgerVoucher.number).in_(keys),
+        )
+    ).scalars().all()
+    if not ids:
+        return 0
+    db.execute(delete(LedgerTransaction).where(LedgerTransaction.voucher_id.in_(ids)))
+    db.execute(delete(LedgerVoucher).where(LedgerVoucher.id.in_(ids)))
+    return len(ids)
+
+
+def _balance_rows(db: Session, company_id: int, kind: str, keys) -> dict[tuple[str, object], LedgerAccountBalance]:
+    return {
+        (row.account, row.period): row
+        for row in db.query(LedgerAccountBalance).filter(
+            LedgerAccountBalance.company_id == company_id,
+            LedgerAccountBalance.kind == kind,
+            tuple_(LedgerAccountBalance.account, LedgerAccountBalance.period).in_(list(keys)),
+        )
+    }
+
+
+def _sync_balance_rows(db: Session, company_id: int, kind: str, wanted: dict[tuple[str, object], Decimal]) -> None:
+    """
+    Make the `kind` rows for the keys in `wanted` match it; a key mapped to None is deleted.
+    """
+    if not wanted:
+        return
+    existing = _balance_rows(db, company_id, kind, wanted)
+    for (account, period), amount in wanted.items():
+        row = existing.get((account, period))
+        if amount is None:
+            if row is not None:
+                db.delete(row)
+        elif row is None:
+            db.add(LedgerAccountBalance(company_id=company_id, account=account, kind=kind, period=period, amount=amount))
+        elif row.amount != amount:
+            row.amount = amount
+
+
+def _apply_movement_deltas(db: Session, company_id: int, deltas: dict[tuple[str, object], Decimal]) -> None:
+    if not deltas:
+        return
+    existing = _balance_rows(db, company_id, "MOVEMENT", deltas)
+    for (account, period), delta in deltas.items():
+        row = existing.get((account, period))
+        if row is None:
+            db.add(LedgerAccountBalance(company_id=company_id, account=account, kind="MOVEMENT", period=period, amount=delta))
+        elif row.amount + delta == 0:
+            db.delete(row)
+        else:
+            row.amount = row.amount + delta
+
+
+def sync_company_ledger(db: Session, company_id: int, old_content: str | None, new_content: str) -> None:
+    """
+    Bring the ledger tables from `old_content` to `new_content`, touching only
+    vouchers that were added, removed or changed. Pass old_content=None when the
+    tables may not mirror the previous content (see CompanySIEState.ledger_version):
+    that, a file with repeated vouchers, or most vouchers changing falls back to a
+    full rebuild. Caller commits.
+    """
+    old = _split_vouchers(old_content) if old_content is not None else None
+    new = _split_vouchers(new_content) if old is not None else None
+    if old is None or new is None:
+        rebuild_company_ledger(db, company_id, new_content)
+        return
+    old_blocks, old_other = old
+    new_blocks, new_other = new
+
+    removed = [k for k in old_blocks if k not in new_blocks]
+    added = [k for k in new_blocks if k not in old_blocks]
+    changed = [k for k, block in new_blocks.items() if k in old_blocks and old_blocks[k] != block]
+
+    if len(removed) + len(added) + len(changed) > FULL_REBUILD_RATIO * max(len(new_blocks), 1) + 1:
+        rebuild_company_ledger(db, company_id, new_content)
+        return
+
+    old_vouchers = _parse_blocks(old_blocks[k] for k in removed + changed)
+    new_vouchers = _parse_blocks(new_blocks[k] for k in added + changed)
+
+    if _delete_vouchers(db, company_id, list(old_vouchers)) != len(old_vouchers):
+        # the tables don't hold what the previous content says they should
+        logger.warning("Company %s: ledger tables out of sync with the SIE state; rebuilding", company_id)
+        rebuild_company_ledger(db, company_id, new_content)
+        return
+    _insert_vouchers(db, company_id, list(new_vouchers.values()))
+
+    deltas: dict[tuple[str, object], Decimal] = defaultdict(Decimal)
+    for key, amount in _movements(old_vouchers.values()).items():
+        deltas[key] -= amount
+    for key, amount in _movements(new_vouchers.values()).items():
+        deltas[key] += amount
+    _apply_movement_deltas(db, company_id, {key: delta for key, delta in deltas.items() if delta})
+
+    # Opening balances and the #RAR years they hang on live outside the voucher
+    # blocks; they are few, so diff them directly when those lines changed.
+    if old_other != new_other:
+        new_ledger = parse_sie_ledger("\n".join(new_other))
+        _replace_fiscal_years(db, company_id, new_ledger)
+        old_ib = _opening_balances(company_id, parse_sie_ledger("\n".join(old_other)))
+        new_ib = _opening_balances(company_id, new_ledger)
+        _sync_balance_rows(
+            db,
+            company_id,
+            "IB",
+            {key: new_ib.get(key) for key in old_ib.keys() | new_ib.keys() if old_ib.get(key) != new_ib.get(key)},
+        )
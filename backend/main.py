@@ -1,23 +1,55 @@
 import os
+import asyncio
+import json
 import logging
-import time
-from pathlib import Path
-from datetime import datetime
+from datetime import date, datetime
 from datetime import timedelta
 
-from fastapi import FastAPI, Depends, Header, HTTPException, Request
+from fastapi import FastAPI, Depends, Header, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel, EmailStr
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, defer, joinedload
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import text
-
-from alembic import command
-from alembic.config import Config
-
-from database import get_db, SessionLocal, DATABASE_URL
-from passlib.context import CryptContext
+from sqlalchemy import text, func, case, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import (
+    get_db,
+    get_async_db,
+    get_async_read_db,
+    SessionLocal,
+    AsyncReadSessionLocal,
+    DATABASE_URL,
+    async_engine,
+    engine,
+)
+from events import (
+    PostgresEventListener,
+    broker as company_event_broker,
+    format_sse,
+    publish_company_event_async,
+)
+from ledger import sync_company_ledger
+from responses import FastJSONResponse
+from migrate import run_startup_migrations
+from membership_cache import MembershipInfo, membership_cache
+from metrics import render_metrics
+from request_metrics import RequestMetricsMiddleware, instrument_db_timing
+from passwords import PasswordHasherBusy, hash_password_async, password_hasher, verify_password_async
+from sweeper import ExpirySweeper
+from sie import (
+    SIE_CODECS,
+    SIEPatchError,
+    apply_line_edits,
+    apply_sie_patch,
+    compress_sie_content,
+    decompress_sie_content,
+    diff_sie_content,
+    split_sie_lines,
+)
 from models import (
     User,
     SIEFile,
@@ -27,6 +59,11 @@ from models import (
     Customer,
     Product,
     CompanySIEState,
+    CompanySIERevision,
+    LedgerVoucher,
+    LedgerTransaction,
+    LedgerAccountBalance,
+    LedgerFiscalYear,
     CompanyLock,
     CompanyJoinRequest,
     CompanyJoinRequestStatus,
@@ -40,7 +77,7 @@ from models import (
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("snug-api")
 
-app = FastAPI()
+app = FastAPI(default_response_class=FastJSONResponse)
 
 @app.middleware("http")
 async def log_login_request(request: Request, call_next):
@@ -58,8 +95,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Content-Encoding"],
 )
 
+# outermost, so latency includes the other middleware; see request_metrics.py
+app.add_middleware(RequestMetricsMiddleware)
+instrument_db_timing(engine)
+instrument_db_timing(async_engine.sync_engine)
+
 # ------------------------------------------------------------
 # Exception handler: log traceback + return JSON
 # ------------------------------------------------------------
@@ -69,6 +112,13 @@ async def global_exception_handler(request: Request, exc: Exception):
     return JSONResponse(status_code=500, content={"detail": "Internal Server Error"})
 
 
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    return JSONResponse(
+        status_code=503, content={"detail": str(exc)}, headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
 # ------------------------------------------------------------
 # Schemas
 # ------------------------------------------------------------
@@ -150,6 +200,27 @@ class CompanyUpdate(BaseModel):
 class CompanySIEStateUpsert(BaseModel):
     user_id: int
     sie_content: str
+
+
+class SIELineEdit(BaseModel):
+    # replace lines[start:start + delete] (positions in the base version) with insert
+    start: int
+    delete: int = 0
+    insert: list[str] = []
+
+
+class SIEVoucherEdit(BaseModel):
+    series: str
+    number: str
+    # full #VER block lines; None deletes the voucher
+    lines: list[str] | None = None
+
+
+class CompanySIEStatePatch(BaseModel):
+    user_id: int
+    base_version: int
+    line_edits: list[SIELineEdit] = []
+    voucher_edits: list[SIEVoucherEdit] = []
     
 
 class CompanyLockRequest(BaseModel):
@@ -212,93 +283,41 @@ class JoinCompanyByOrgNumber(BaseModel):
 
 
 # ------------------------------------------------------------
-# Password
+# Access helpers
 # ------------------------------------------------------------
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
-
-
-def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
-    
-    
 def is_company_admin_or_owner(db: Session, company_id: int, user_id: int) -> bool:
-    membership = (
-        db.query(CompanyMember)
-        .filter(CompanyMember.company_id == company_id, CompanyMember.user_id == user_id)
-        .first()
-    )
+    membership = get_company_membership(db, company_id, user_id)
     if not membership:
         return False
     return membership.role in ["OWNER", "ADMIN"]
 
 
-# ------------------------------------------------------------
-# DB / migrations helpers
-# ------------------------------------------------------------
-def wait_for_db(max_attempts: int = 45, delay_seconds: int = 2) -> None:
-    last_exc: Exception | None = None
-    for _ in range(max_attempts):
-        try:
-            db = SessionLocal()
-            db.execute(text("SELECT 1"))
-            db.close()
-            logger.info("DB is ready.")
-            return
-        except Exception as exc:
-            last_exc = exc
-            logger.info("Waiting for DB...")
-            time.sleep(delay_seconds)
-    logger.exception("DB not ready after retries")
-    if last_exc:
-        raise last_exc
-    raise RuntimeError("DB not ready")
-
-
-def ensure_alembic_version_table():
-    """
-    Ensure alembic_version exists and its version_num can hold long revision IDs.
-    """
-    db = SessionLocal()
-    try:
-        db.execute(
-            text("CREATE TABLE IF NOT EXISTS alembic_version (version_num VARCHAR(128) NOT NULL PRIMARY KEY);")
-        )
-        # If someone created it with VARCHAR(32) earlier, expand it
-        try:
-            db.execute(text("ALTER TABLE alembic_version ALTER COLUMN version_num TYPE VARCHAR(128);"))
-        except Exception:
-            pass
-        db.commit()
-    finally:
-        db.close()
-
-
-def run_migrations_to_head():
-    wait_for_db()
-    ensure_alembic_version_table()
-
-    alembic_ini = Path(__file__).with_name("alembic.ini")
-    migrations_path = Path(__file__).parent / "alembic"
-
-    cfg = Config(str(alembic_ini))
-    cfg.set_main_option("script_location", str(migrations_path))
-    cfg.set_main_option("sqlalchemy.url", DATABASE_URL)
-
-    logger.info("Running migrations to head...")
-    command.upgrade(cfg, "head")
-    logger.info("Migrations complete.")
+company_event_listener = PostgresEventListener(DATABASE_URL) if engine.dialect.name == "postgresql" else None
+expiry_sweeper = ExpirySweeper(SessionLocal)
 
 
 @app.on_event("startup")
 def on_startup():
     try:
-        run_migrations_to_head()
+        run_startup_migrations()
     except Exception:
-        logger.exception("Startup migrations failed (API will error until fixed).")
+        logger.exception("Startup schema check failed (API will error until fixed).")
+    if company_event_listener:
+        company_event_listener.start()
+    expiry_sweeper.start()
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    if company_event_listener:
+        company_event_listener.stop()
+    expiry_sweeper.stop()
+    password_hasher.shutdown()
+
+
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    await async_engine.dispose()
 
 
 # ------------------------------------------------------------
@@ -315,18 +334,85 @@ def health():
         return {"status": "ok", "db": "unavailable"}
 
 
+@app.get("/metrics")
+def metrics():
+    return Response(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# ------------------------------------------------------------
+# Pagination (keyset on a unique, ascending integer column)
+# ------------------------------------------------------------
+PAGE_LIMIT_DEFAULT = 100
+PAGE_LIMIT_MAX = 1000
+
+
+class PageParams:
+    """
+    Query params shared by list endpoints:
+    ?limit=..&cursor=.. -> {"items": [...], "nextCursor": "..." | null}
+    ?paginate=false     -> the old bare list with every row
+    """
+
+    def __init__(
+        self,
+        limit: int = Query(PAGE_LIMIT_DEFAULT, ge=1, le=PAGE_LIMIT_MAX),
+        cursor: str | None = None,
+        paginate: bool = True,
+    ):
+        self.limit = limit
+        self.paginate = paginate
+        self.after = None
+        if cursor:
+            try:
+                self.after = int(cursor)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _paginate(db: Session, stmt, key_column, key_name: str, page: PageParams):
+    """
+    Run a column-projected select (columns labelled with their JSON names) ordered by
+    key_column, returning rows as plain dicts. key_name is the label of key_column.
+    """
+    stmt = stmt.order_by(key_column)
+    if not page.paginate:
+        return FastJSONResponse([dict(row) for row in db.execute(stmt).mappings()])
+
+    if page.after is not None:
+        stmt = stmt.where(key_column > page.after)
+    rows = [dict(row) for row in db.execute(stmt.limit(page.limit + 1)).mappings()]
+
+    next_cursor = None
+    if len(rows) > page.limit:
+        rows = rows[: page.limit]
+        next_cursor = str(rows[-1][key_name])
+    # rows are plain JSON-ready dicts; skip jsonable_encoder
+    return FastJSONResponse({"items": rows, "nextCursor": next_cursor})
+
+
 # ------------------------------------------------------------
 # Users + Auth
 # ------------------------------------------------------------
 @app.get("/users")
-def list_users(db: Session = Depends(get_db)):
-    users = db.query(User).all()
-    return [{"id": u.id, "email": u.email, "name": u.name, "role": u.role} for u in users]
+def list_users(page: PageParams = Depends(), db: Session = Depends(get_db)):
+    stmt = select(User.id, User.email, User.name, User.role)
+    return _paginate(db, stmt, User.id, "id", page)
 
 
-@app.post("/users")
-def create_user(payload: UserCreate, db: Session = Depends(get_db)):
-    user = User(email=payload.email, password=hash_password(payload.password), name=payload.name, role="user")
+# Auth handlers are async so waiting on bcrypt (see passwords.py) holds neither a
+# threadpool thread nor a pooled DB connection; their DB work runs in the threadpool
+# and each step closes the session to hand the connection back before hashing.
+def _get_login_row(db: Session, email: str):
+    try:
+        return db.execute(
+            select(User.id, User.email, User.name, User.role, User.password).where(User.email == email)
+        ).first()
+    finally:
+        db.close()
+
+
+def _insert_user(db: Session, email: str, password_hash: str, name: str) -> dict:
+    user = User(email=email, password=password_hash, name=name, role="user")
     db.add(user)
     try:
         db.commit()
@@ -337,22 +423,33 @@ def create_user(payload: UserCreate, db: Session = Depends(get_db)):
     return {"id": user.id, "email": user.email, "name": user.name}
 
 
+def _set_user_password(db: Session, user_id: int, password_hash: str) -> None:
+    db.query(User).filter(User.id == user_id).update({User.password: password_hash}, synchronize_session=False)
+    db.commit()
+
+
+@app.post("/users")
+async def create_user(payload: UserCreate, db: Session = Depends(get_db)):
+    password_hash = await hash_password_async(payload.password)
+    return await run_in_threadpool(_insert_user, db, payload.email, password_hash, payload.name)
+
+
 @app.post("/auth/login")
-def login(payload: LoginRequest, db: Session = Depends(get_db)):
+async def login(payload: LoginRequest, db: Session = Depends(get_db)):
     logger.info("LOGIN payload received: email=%s password=%s", payload.email, len(payload.password or ""))
-    user = db.query(User).filter(User.email == payload.email).first()
-    if not user or not verify_password(payload.password, user.password):
+    user = await run_in_threadpool(_get_login_row, db, payload.email)
+    if not user or not await verify_password_async(payload.password, user.password):
         return {"success": False, "error": "Invalid email or password"}
     return {"success": True, "user": {"id": user.id, "email": user.email, "name": user.name, "role": user.role}}
 
 
 @app.post("/auth/reset")
-def reset_password(payload: ResetPasswordRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == payload.email).first()
+async def reset_password(payload: ResetPasswordRequest, db: Session = Depends(get_db)):
+    user = await run_in_threadpool(_get_login_row, db, payload.email)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    user.password = hash_password(payload.new_password)
-    db.commit()
+    password_hash = await hash_password_async(payload.new_password)
+    await run_in_threadpool(_set_user_password, db, user.id, password_hash)
     return {"success": True}
 
 
@@ -372,6 +469,7 @@ def update_user_role(
         raise HTTPException(status_code=404, detail="User not found")
     user.role = payload.role
     db.commit()
+    membership_cache.invalidate(user_id=user_id)
     return {"success": True}
 
 
@@ -409,22 +507,52 @@ def create_receipt(payload: ReceiptCreate, db: Session = Depends(get_db)):
 # ------------------------------------------------------------
 # Membership helpers
 # ------------------------------------------------------------
-def require_company_access(db: Session, company_id: int, user_id: int) -> CompanyMember:
-    membership = (
-        db.query(CompanyMember)
-        .filter(
-            CompanyMember.company_id == company_id,
-            CompanyMember.user_id == user_id,
-            CompanyMember.status == "ACTIVE",
-        )
-        .first()
+def _membership_stmt(company_id: int, user_id: int):
+    return select(CompanyMember.company_id, CompanyMember.user_id, CompanyMember.role, CompanyMember.status).where(
+        CompanyMember.company_id == company_id, CompanyMember.user_id == user_id
     )
-    if not membership:
+
+
+def _cache_membership(company_id: int, user_id: int, row) -> MembershipInfo | None:
+    membership = MembershipInfo(*row) if row else None
+    membership_cache.set(company_id, user_id, membership)
+    return membership
+
+
+def _check_membership_active(membership: MembershipInfo | None) -> MembershipInfo:
+    if not membership or membership.status != "ACTIVE":
         raise HTTPException(status_code=403, detail="No access to this company")
     return membership
 
 
-def require_company_admin(db: Session, company_id: int, user_id: int) -> CompanyMember:
+def get_company_membership(db: Session, company_id: int, user_id: int) -> MembershipInfo | None:
+    """
+    Membership of user_id in company_id (any status), served from a short-TTL cache.
+    Call membership_cache.invalidate(...) after committing membership changes.
+    """
+    hit, membership = membership_cache.get(company_id, user_id)
+    if hit:
+        return membership
+    return _cache_membership(company_id, user_id, db.execute(_membership_stmt(company_id, user_id)).first())
+
+
+async def get_company_membership_async(db: AsyncSession, company_id: int, user_id: int) -> MembershipInfo | None:
+    hit, membership = membership_cache.get(company_id, user_id)
+    if hit:
+        return membership
+    row = (await db.execute(_membership_stmt(company_id, user_id))).first()
+    return _cache_membership(company_id, user_id, row)
+
+
+def require_company_access(db: Session, company_id: int, user_id: int) -> MembershipInfo:
+    return _check_membership_active(get_company_membership(db, company_id, user_id))
+
+
+async def require_company_access_async(db: AsyncSession, company_id: int, user_id: int) -> MembershipInfo:
+    return _check_membership_active(await get_company_membership_async(db, company_id, user_id))
+
+
+def require_company_admin(db: Session, company_id: int, user_id: int) -> MembershipInfo:
     membership = require_company_access(db, company_id, user_id)
     if membership.role not in ("OWNER", "ADMIN"):
         raise HTTPException(status_code=403, detail="Admin access required")
@@ -445,115 +573,224 @@ def _lock_expires_at():
     return _now_utc() + timedelta(minutes=_lock_ttl_minutes())
 
 
-def _cleanup_expired_lock(db: Session, company_id: int):
-    lock = db.query(CompanyLock).filter(CompanyLock.company_id == company_id).first()
-    if not lock:
-        return None
-    if lock.expires_at <= _now_utc():
-        db.delete(lock)
-        db.commit()
-        return None
-    return lock
+def _live_lock_stmt(company_id: int):
+    # expired rows are removed by the background sweeper (sweeper.py); until then they are ignored
+    # the locking user is joined in so building "lockedBy" needs no extra query
+    return (
+        select(CompanyLock)
+        .options(joinedload(CompanyLock.locked_by_user))
+        .where(CompanyLock.company_id == company_id, CompanyLock.expires_at > _now_utc())
+    )
+
+
+def _get_live_lock(db: Session, company_id: int):
+    return db.scalars(_live_lock_stmt(company_id)).first()
+
+
+async def _get_live_lock_async(db: AsyncSession, company_id: int):
+    return (await db.scalars(_live_lock_stmt(company_id))).first()
+
+
+def _locked_by(lock: CompanyLock) -> dict:
+    u = lock.locked_by_user
+    return {"id": u.id, "email": u.email, "name": u.name} if u else {"id": lock.locked_by_user_id}
+
+
+def _acquire_lock_stmt(dialect_name: str, company_id: int, user_id: int, now: datetime):
+    """
+    Take or extend the company lock in one statement:
+    INSERT ... ON CONFLICT (company_id) DO UPDATE ... WHERE expired OR owned RETURNING.
+
+    Returns no row when someone else holds a live lock. The returned locked_at equals
+    now when the lock was newly taken (not just extended).
+    """
+    dialect_insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    stmt = dialect_insert(CompanyLock).values(
+        company_id=company_id,
+        locked_by_user_id=user_id,
+        locked_at=now,
+        expires_at=now + timedelta(minutes=_lock_ttl_minutes()),
+    )
+    live_and_owned = (CompanyLock.locked_by_user_id == user_id) & (CompanyLock.expires_at > now)
+    return stmt.on_conflict_do_update(
+        index_elements=[CompanyLock.company_id],
+        set_={
+            "locked_by_user_id": stmt.excluded.locked_by_user_id,
+            # keep locked_at when the owner just extends a live lock
+            "locked_at": case((live_and_owned, CompanyLock.locked_at), else_=stmt.excluded.locked_at),
+            "expires_at": stmt.excluded.expires_at,
+        },
+        where=or_(CompanyLock.expires_at <= now, CompanyLock.locked_by_user_id == user_id),
+    ).returning(CompanyLock.locked_by_user_id, CompanyLock.locked_at, CompanyLock.expires_at)
+
+
+async def _acquire_company_lock_async(db: AsyncSession, company_id: int, user_id: int):
+    """
+    (row, acquired): row is None when someone else holds a live lock; acquired is
+    True when the lock was newly taken (not just extended). Caller commits.
+    """
+    now = _now_utc()
+    stmt = _acquire_lock_stmt(db.get_bind().dialect.name, company_id, user_id, now)
+    row = (await db.execute(stmt)).first()
+    if row is None:
+        return None, False
+    return row, row.locked_at == now
+
+
+async def _take_company_lock_async(db: AsyncSession, company_id: int, user_id: int):
+    """
+    (row, acquired, conflict) for lock and heartbeat. When someone else holds a live
+    lock, row is None and conflict is the response body naming them. Caller commits.
+    """
+    for _ in range(2):
+        row, acquired = await _acquire_company_lock_async(db, company_id, user_id)
+        if row is not None:
+            return row, acquired, None
+        await db.rollback()
+        lock = await _get_live_lock_async(db, company_id)
+        if lock is not None:
+            return None, False, {
+                "success": False,
+                "companyId": company_id,
+                "locked": True,
+                "lockedBy": _locked_by(lock),
+                "expiresAt": lock.expires_at.isoformat(),
+            }
+        # unlocked, swept or expired between the two statements: try to take it once more
+    return None, False, {"success": False, "companyId": company_id, "locked": False}
+
+
+# Lock, heartbeat, takeover and sie-state read endpoints are polled constantly and
+# are pure DB round trips, so they run on the async engine (database.async_engine)
+# and hold no threadpool thread while waiting on Postgres. Read-only ones use
+# get_async_read_db (autocommit, no BEGIN/ROLLBACK round trips).
+@app.get("/companies/locks")
+async def list_company_locks(
+    user_id: int,
+    company_ids: list[int] | None = Query(None),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    Lock state for many companies in one query (company list view).
+    Only companies where the caller is an active member are returned; without
+    company_ids, all of the caller's companies are returned.
+    """
+    now = _now_utc()
+    stmt = (
+        select(
+            CompanyMember.company_id,
+            CompanyLock.locked_by_user_id,
+            CompanyLock.expires_at,
+            CompanyLock.locked_at,
+            User.email,
+            User.name,
+        )
+        .outerjoin(
+            CompanyLock,
+            (CompanyLock.company_id == CompanyMember.company_id) & (CompanyLock.expires_at > now),
+        )
+        .outerjoin(User, User.id == CompanyLock.locked_by_user_id)
+        .where(CompanyMember.user_id == user_id, CompanyMember.status == "ACTIVE")
+        .order_by(CompanyMember.company_id)
+    )
+    if company_ids is not None:
+        stmt = stmt.where(CompanyMember.company_id.in_(company_ids))
+
+    result = []
+    for row in await db.execute(stmt):
+        if row.locked_by_user_id is None:
+            result.append({"companyId": row.company_id, "locked": False})
+            continue
+        result.append(
+            {
+                "companyId": row.company_id,
+                "locked": True,
+                "lockedBy": {"id": row.locked_by_user_id, "email": row.email, "name": row.name},
+                "expiresAt": row.expires_at.isoformat(),
+                "lockedAt": row.locked_at.isoformat() if row.locked_at else None,
+            }
+        )
+    return FastJSONResponse(result)
 
 
 @app.get("/companies/{company_id}/lock")
-def get_company_lock(company_id: int, user_id: int, db: Session = Depends(get_db)):
+async def get_company_lock(company_id: int, user_id: int, db: AsyncSession = Depends(get_async_read_db)):
     # must have access to view lock
-    require_company_access(db, company_id, user_id)
+    await require_company_access_async(db, company_id, user_id)
 
-    lock = _cleanup_expired_lock(db, company_id)
+    lock = await _get_live_lock_async(db, company_id)
     if not lock:
         return {"locked": False}
 
-    u = db.query(User).filter(User.id == lock.locked_by_user_id).first()
     return {
         "locked": True,
         "companyId": company_id,
-        "lockedBy": {"id": u.id, "email": u.email, "name": u.name} if u else {"id": lock.locked_by_user_id},
+        "lockedBy": _locked_by(lock),
         "expiresAt": lock.expires_at.isoformat(),
         "lockedAt": lock.locked_at.isoformat() if lock.locked_at else None,
     }
 
 
 @app.post("/companies/{company_id}/lock")
-def lock_company(company_id: int, payload: CompanyLockRequest, db: Session = Depends(get_db)):
+async def lock_company(company_id: int, payload: CompanyLockRequest, db: AsyncSession = Depends(get_async_db)):
     # must have access to lock
-    require_company_access(db, company_id, payload.user_id)
+    await require_company_access_async(db, company_id, payload.user_id)
 
-    lock = _cleanup_expired_lock(db, company_id)
+    row, acquired, conflict = await _take_company_lock_async(db, company_id, payload.user_id)
 
-    # No lock -> create lock for this user
-    if not lock:
-        new_lock = CompanyLock(
-            company_id=company_id,
-            locked_by_user_id=payload.user_id,
-            locked_at=_now_utc(),
-            expires_at=_lock_expires_at(),
-        )
-        db.add(new_lock)
-        db.commit()
-        return {"success": True, "companyId": company_id, "locked": True}
+    # Lock owned by someone else -> return info for popup
+    if row is None:
+        return conflict
 
-    # Lock exists and owned by same user -> extend TTL
-    if lock.locked_by_user_id == payload.user_id:
-        lock.expires_at = _lock_expires_at()
-        db.commit()
-        return {"success": True, "companyId": company_id, "locked": True, "alreadyOwned": True}
+    if acquired:
+        await publish_company_event_async(db, company_id, "lock", {"locked": True, "lockedByUserId": payload.user_id})
+        await db.commit()
+        return {"success": True, "companyId": company_id, "locked": True}
 
-    # Lock exists and owned by someone else -> return info for popup
-    u = db.query(User).filter(User.id == lock.locked_by_user_id).first()
-    return {
-        "success": False,
-        "companyId": company_id,
-        "locked": True,
-        "lockedBy": {"id": u.id, "email": u.email, "name": u.name} if u else {"id": lock.locked_by_user_id},
-        "expiresAt": lock.expires_at.isoformat(),
-    }
+    # already owned by same user -> TTL extended
+    await db.commit()
+    return {"success": True, "companyId": company_id, "locked": True, "alreadyOwned": True}
 
 
 TAKEOVER_REQUEST_SECONDS = 30
 
 
 @app.post("/companies/{company_id}/takeover-request")
-def create_takeover_request(company_id: int, payload: CompanyLockPayload, db: Session = Depends(get_db)):
+async def create_takeover_request(company_id: int, payload: CompanyLockPayload, db: AsyncSession = Depends(get_async_db)):
     # user måste vara medlem för att få göra takeover
-    member = (
-        db.query(CompanyMember)
-        .filter(
-            CompanyMember.company_id == company_id,
-            CompanyMember.user_id == payload.user_id,
-            CompanyMember.status == "ACTIVE",
-        )
-        .first()
-    )
-    if not member:
-        raise HTTPException(status_code=403, detail="No access to this company")
+    await require_company_access_async(db, company_id, payload.user_id)
     user_id = int(payload.user_id)
 
-    lock = db.query(CompanyLock).filter(CompanyLock.company_id == company_id).first()
+    lock = await _get_live_lock_async(db, company_id)
 
     if not lock:
         return {"success": False, "message": "Company is not locked"}
 
+    now = datetime.utcnow()
+
     # finns redan pending request?
-    existing = (
-        db.query(CompanyLockTakeoverRequest)
-        .filter(
+    existing = await db.scalar(
+        select(CompanyLockTakeoverRequest).where(
             CompanyLockTakeoverRequest.company_id == company_id,
             CompanyLockTakeoverRequest.requested_by_user_id == user_id,
             CompanyLockTakeoverRequest.status == CompanyLockTakeoverStatus.PENDING,
         )
-        .first()
     )
 
-    if existing:
+    if existing and existing.expires_at > now:
         return {
             "success": True,
             "alreadyRequested": True,
             "expiresAt": existing.expires_at.isoformat(),
         }
 
-    expires = datetime.utcnow() + timedelta(seconds=TAKEOVER_REQUEST_SECONDS)
+    if existing:
+        # expired but not swept yet; free the pending slot for the new request
+        existing.status = CompanyLockTakeoverStatus.EXPIRED
+        existing.decided_at = now
+        await db.flush()
+
+    expires = now + timedelta(seconds=TAKEOVER_REQUEST_SECONDS)
 
     req = CompanyLockTakeoverRequest(
         company_id=company_id,
@@ -563,7 +800,14 @@ def create_takeover_request(company_id: int, payload: CompanyLockPayload, db: Se
     )
 
     db.add(req)
-    db.commit()
+    await db.flush()
+    await publish_company_event_async(
+        db,
+        company_id,
+        "takeover",
+        {"action": "requested", "requestId": req.id, "requestedByUserId": user_id, "lockedByUserId": lock.locked_by_user_id},
+    )
+    await db.commit()
 
     return {
         "success": True,
@@ -574,27 +818,26 @@ def create_takeover_request(company_id: int, payload: CompanyLockPayload, db: Se
 
 
 @app.get("/companies/{company_id}/takeover-requests")
-def list_takeover_requests(company_id: int, user_id: int, db: Session = Depends(get_db)):
+async def list_takeover_requests(company_id: int, user_id: int, db: AsyncSession = Depends(get_async_read_db)):
     # must have access to view takeover requests
-    require_company_access(db, company_id, user_id)
+    await require_company_access_async(db, company_id, user_id)
 
-    _cleanup_expired_lock(db, company_id)
     now = datetime.utcnow()
 
-    requests = (
-        db.query(CompanyLockTakeoverRequest)
-        .filter(
+    requests = await db.scalars(
+        select(CompanyLockTakeoverRequest)
+        .options(joinedload(CompanyLockTakeoverRequest.requested_by))
+        .where(
             CompanyLockTakeoverRequest.company_id == company_id,
             CompanyLockTakeoverRequest.status == CompanyLockTakeoverStatus.PENDING,
             CompanyLockTakeoverRequest.expires_at > now,
         )
-        .all()
     )
 
     result = []
 
     for r in requests:
-        user = db.query(User).filter(User.id == r.requested_by_user_id).first()
+        user = r.requested_by
 
         result.append(
             {
@@ -609,23 +852,24 @@ def list_takeover_requests(company_id: int, user_id: int, db: Session = Depends(
         )
 
     return result
-    
-    
-@app.post("/companies/takeover/{request_id}/approve")
-def approve_takeover(request_id: int, payload: CompanyLockPayload, db: Session = Depends(get_db)):
-    user_id = int(payload.user_id)
 
-    req = db.query(CompanyLockTakeoverRequest).filter(CompanyLockTakeoverRequest.id == request_id).first()
+
+async def _get_decidable_takeover(db: AsyncSession, request_id: int, user_id: int):
+    """
+    (request, lock) for approve/reject by the current lock owner, or (request, None)
+    when the request is no longer pending.
+    """
+    req = await db.get(CompanyLockTakeoverRequest, request_id)
 
     if not req:
         raise HTTPException(status_code=404, detail="Takeover request not found")
 
-    require_company_access(db, req.company_id, user_id)
+    await require_company_access_async(db, req.company_id, user_id)
 
     if req.status != CompanyLockTakeoverStatus.PENDING:
-        return {"success": False}
+        return req, None
 
-    lock = db.query(CompanyLock).filter(CompanyLock.company_id == req.company_id).first()
+    lock = await db.scalar(select(CompanyLock).where(CompanyLock.company_id == req.company_id))
 
     if not lock:
         raise HTTPException(status_code=400, detail="Company not locked")
@@ -634,6 +878,17 @@ def approve_takeover(request_id: int, payload: CompanyLockPayload, db: Session =
     if lock.locked_by_user_id != user_id:
         raise HTTPException(status_code=403, detail="Not lock owner")
 
+    return req, lock
+
+
+@app.post("/companies/takeover/{request_id}/approve")
+async def approve_takeover(request_id: int, payload: CompanyLockPayload, db: AsyncSession = Depends(get_async_db)):
+    user_id = int(payload.user_id)
+
+    req, lock = await _get_decidable_takeover(db, request_id, user_id)
+    if lock is None:
+        return {"success": False}
+
     req.status = CompanyLockTakeoverStatus.APPROVED
     req.decided_by_user_id = user_id
     req.decided_at = datetime.utcnow()
@@ -642,145 +897,298 @@ def approve_takeover(request_id: int, payload: CompanyLockPayload, db: Session =
     lock.locked_at = _now_utc()
     lock.expires_at = _lock_expires_at()
 
-    db.commit()
+    await publish_company_event_async(
+        db,
+        req.company_id,
+        "takeover",
+        {"action": "approved", "requestId": req.id, "requestedByUserId": req.requested_by_user_id},
+    )
+    await publish_company_event_async(
+        db, req.company_id, "lock", {"locked": True, "lockedByUserId": req.requested_by_user_id}
+    )
+    await db.commit()
 
     return {"success": True}
-    
-    
-@app.post("/companies/takeover/{request_id}/reject")
-def reject_takeover(request_id: int, payload: CompanyLockPayload, db: Session = Depends(get_db)):
-    user_id = int(payload.user_id)
 
-    req = db.query(CompanyLockTakeoverRequest).filter(CompanyLockTakeoverRequest.id == request_id).first()
 
-    if not req:
-        raise HTTPException(status_code=404, detail="Takeover request not found")
-
-    require_company_access(db, req.company_id, user_id)
+@app.post("/companies/takeover/{request_id}/reject")
+async def reject_takeover(request_id: int, payload: CompanyLockPayload, db: AsyncSession = Depends(get_async_db)):
+    user_id = int(payload.user_id)
 
-    if req.status != CompanyLockTakeoverStatus.PENDING:
+    req, lock = await _get_decidable_takeover(db, request_id, user_id)
+    if lock is None:
         return {"success": False}
 
-    lock = db.query(CompanyLock).filter(CompanyLock.company_id == req.company_id).first()
-
-    if not lock:
-        raise HTTPException(status_code=400, detail="Company not locked")
-
-    if lock.locked_by_user_id != user_id:
-        raise HTTPException(status_code=403, detail="Not lock owner")
-
     req.status = CompanyLockTakeoverStatus.REJECTED
     req.decided_by_user_id = user_id
     req.decided_at = datetime.utcnow()
 
-    db.commit()
+    await publish_company_event_async(
+        db,
+        req.company_id,
+        "takeover",
+        {"action": "rejected", "requestId": req.id, "requestedByUserId": req.requested_by_user_id},
+    )
+    await db.commit()
 
     return {"success": True}
 
 
 @app.post("/companies/{company_id}/lock/heartbeat")
-def lock_heartbeat(company_id: int, payload: CompanyLockRequest, db: Session = Depends(get_db)):
+async def lock_heartbeat(company_id: int, payload: CompanyLockRequest, db: AsyncSession = Depends(get_async_db)):
     # must have access
-    require_company_access(db, company_id, payload.user_id)
+    await require_company_access_async(db, company_id, payload.user_id)
 
-    lock = _cleanup_expired_lock(db, company_id)
-    if not lock:
-        # If no lock, heartbeat behaves like "try lock"
-        new_lock = CompanyLock(
-            company_id=company_id,
-            locked_by_user_id=payload.user_id,
-            locked_at=_now_utc(),
-            expires_at=_lock_expires_at(),
-        )
-        db.add(new_lock)
-        db.commit()
-        return {"success": True, "companyId": company_id, "locked": True, "created": True}
+    # If no (live) lock, heartbeat behaves like "try lock"
+    row, acquired, conflict = await _take_company_lock_async(db, company_id, payload.user_id)
+    if row is None:
+        return conflict
 
-    if lock.locked_by_user_id != payload.user_id:
-        u = db.query(User).filter(User.id == lock.locked_by_user_id).first()
-        return {
-            "success": False,
-            "companyId": company_id,
-            "locked": True,
-            "lockedBy": {"id": u.id, "email": u.email, "name": u.name} if u else {"id": lock.locked_by_user_id},
-            "expiresAt": lock.expires_at.isoformat(),
-        }
+    if acquired:
+        await publish_company_event_async(db, company_id, "lock", {"locked": True, "lockedByUserId": payload.user_id})
+        await db.commit()
+        return {"success": True, "companyId": company_id, "locked": True, "created": True}
 
-    lock.expires_at = _lock_expires_at()
-    db.commit()
+    await db.commit()
     return {"success": True, "companyId": company_id, "locked": True, "extended": True}
 
 
 @app.post("/companies/{company_id}/unlock")
-def unlock_company(company_id: int, payload: CompanyUnlockRequest, db: Session = Depends(get_db)):
+async def unlock_company(company_id: int, payload: CompanyUnlockRequest, db: AsyncSession = Depends(get_async_db)):
     # must have access
-    require_company_access(db, company_id, payload.user_id)
+    membership = await require_company_access_async(db, company_id, payload.user_id)
 
-    lock = db.query(CompanyLock).filter(CompanyLock.company_id == company_id).first()
+    lock = await db.scalar(
+        select(CompanyLock)
+        .options(joinedload(CompanyLock.locked_by_user))
+        .where(CompanyLock.company_id == company_id)
+    )
     if not lock:
         return {"success": True, "companyId": company_id, "locked": False}
 
     # only owner of lock (or admin/owner) can unlock
     if lock.locked_by_user_id != payload.user_id:
         # allow admins/owners to break lock
-        membership = db.query(CompanyMember).filter(
-            CompanyMember.company_id == company_id,
-            CompanyMember.user_id == payload.user_id,
-            CompanyMember.status == "ACTIVE",
-        ).first()
-        if not membership or membership.role not in ("OWNER", "ADMIN"):
-            u = db.query(User).filter(User.id == lock.locked_by_user_id).first()
+        if membership.role not in ("OWNER", "ADMIN"):
             return {
                 "success": False,
                 "companyId": company_id,
                 "locked": True,
-                "lockedBy": {"id": u.id, "email": u.email, "name": u.name} if u else {"id": lock.locked_by_user_id},
+                "lockedBy": _locked_by(lock),
                 "expiresAt": lock.expires_at.isoformat(),
                 "detail": "Locked by another user",
             }
 
-    db.delete(lock)
-    db.commit()
+    await db.delete(lock)
+    await publish_company_event_async(db, company_id, "lock", {"locked": False})
+    await db.commit()
     return {"success": True, "companyId": company_id, "locked": False}
 
 
+# ------------------------------------------------------------
+# Company events (server-sent events)
+# ------------------------------------------------------------
+EVENTS_KEEPALIVE_SECONDS = 15
+
+
+@app.get("/companies/{company_id}/events")
+async def stream_company_events(company_id: int, user_id: int, request: Request):
+    """
+    text/event-stream of "lock" and "takeover" events for one company, so clients
+    do not have to poll /takeover-requests and /lock.
+    """
+    # own short session: a Depends() session would stay open for the whole stream
+    async with AsyncReadSessionLocal() as db:
+        await require_company_access_async(db, company_id, user_id)
+    queue = company_event_broker.subscribe(company_id)
+
+    async def stream():
+        try:
+            yield "retry: 3000\n" + format_sse("ready", {"companyId": company_id})
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=EVENTS_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    # comment line keeps proxies from closing an idle stream
+                    yield ": keepalive\n\n"
+                    continue
+                yield message
+        finally:
+            company_event_broker.unsubscribe(company_id, queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # ------------------------------------------------------------
 # Company SIE State
 # ------------------------------------------------------------
+SIE_CONTENT_CODEC = os.getenv("SIE_CONTENT_CODEC", "gzip")
+if SIE_CONTENT_CODEC not in SIE_CODECS:
+    raise RuntimeError(f"SIE_CONTENT_CODEC must be one of {SIE_CODECS}")
+
+
+def _get_sie_content(state: CompanySIEState) -> str:
+    if state.sie_content_compressed is not None:
+        return decompress_sie_content(state.sie_content_compressed, state.sie_content_codec)
+    # legacy row that has not been backfilled yet
+    return state.sie_content or ""
+
+
+def _set_sie_content(state: CompanySIEState, content: str) -> None:
+    state.sie_content_compressed = compress_sie_content(content, SIE_CONTENT_CODEC)
+    state.sie_content_codec = SIE_CONTENT_CODEC
+    state.sie_content = None
+
+
+def _sync_ledger(db: Session, state: CompanySIEState, old_content: str | None, new_content: str) -> None:
+    """Mirror a save into the ledger tables; call after bumping state.version."""
+    # incremental only if the tables were last synced to the version being replaced
+    in_sync = state.ledger_version is not None and state.ledger_version == state.version - 1
+    sync_company_ledger(db, state.company_id, old_content if in_sync else None, new_content)
+    state.ledger_version = state.version
+
+
+def _sie_state_etag(company_id: int, version: int, gzipped: bool = False) -> str:
+    # a gzip-encoded body is a different representation, so it needs its own strong validator
+    return f'"sie-{company_id}-{version}{"-gz" if gzipped else ""}"'
+
+
+def _accepts_gzip(accept_encoding: str | None) -> bool:
+    """Whether Accept-Encoding allows gzip: listed (or "*" if gzip isn't) with q > 0."""
+    qualities: dict[str, float] = {}
+    for item in (accept_encoding or "").split(","):
+        coding, *params = [part.strip() for part in item.split(";")]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qualities[coding.lower()] = q
+    for coding in ("gzip", "x-gzip", "*"):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return False
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    # weak comparison: W/"x" matches "x"
+    return "*" in candidates or any(c.removeprefix("W/") == etag for c in candidates)
+
+
+async def _get_sie_state_async(db: AsyncSession, company_id: int, with_content: bool) -> CompanySIEState | None:
+    stmt = select(CompanySIEState).where(CompanySIEState.company_id == company_id)
+    if not with_content:
+        # conditional request: don't fetch the (large) content until we know it's needed
+        stmt = stmt.options(defer(CompanySIEState.sie_content), defer(CompanySIEState.sie_content_compressed))
+    return await db.scalar(stmt)
+
+
+async def _load_sie_content_async(db: AsyncSession, state: CompanySIEState) -> str:
+    """
+    Fetch the deferred content (no lazy loads under asyncio) and return the ETag to
+    send with it. Version is re-read alongside: it may have moved since the first read.
+    """
+    await db.refresh(
+        state,
+        ["sie_content", "sie_content_compressed", "sie_content_codec", "version", "updated_at", "updated_by_user_id"],
+    )
+    return _sie_state_etag(state.company_id, state.version)
+
+
 @app.get("/companies/{company_id}/sie-state")
-def get_company_sie_state(company_id: int, user_id: int, db: Session = Depends(get_db)):
-    require_company_access(db, company_id, user_id)
-    state = db.query(CompanySIEState).filter(CompanySIEState.company_id == company_id).first()
+async def get_company_sie_state(
+    company_id: int,
+    user_id: int,
+    db: AsyncSession = Depends(get_async_read_db),
+    if_none_match: str | None = Header(default=None, alias="If-None-Match"),
+):
+    await require_company_access_async(db, company_id, user_id)
+
+    state = await _get_sie_state_async(db, company_id, with_content=not if_none_match)
     if not state:
         return {"companyId": company_id, "sieContent": None, "version": None, "updatedAt": None}
 
-    return {
-        "id": state.id,
-        "companyId": state.company_id,
-        "sieContent": state.sie_content,
-        "version": state.version,
-        "updatedAt": state.updated_at.isoformat() if state.updated_at else None,
-        "updatedByUserId": state.updated_by_user_id,
-    }
+    etag = _sie_state_etag(state.company_id, state.version)
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+    if if_none_match:
+        etag = await _load_sie_content_async(db, state)
 
+    # returned directly so the (multi-MB) content is encoded once, without jsonable_encoder
+    return FastJSONResponse(
+        {
+            "id": state.id,
+            "companyId": state.company_id,
+            "sieContent": _get_sie_content(state),
+            "version": state.version,
+            "updatedAt": state.updated_at.isoformat() if state.updated_at else None,
+            "updatedByUserId": state.updated_by_user_id,
+        },
+        headers={"ETag": etag, "Cache-Control": "private, no-cache"},
+    )
 
-@app.put("/companies/{company_id}/sie-state")
-def upsert_company_sie_state(company_id: int, payload: CompanySIEStateUpsert, db: Session = Depends(get_db)):
-    # must have access
-    membership = require_company_access(db, company_id, payload.user_id)
 
+@app.get("/companies/{company_id}/sie-state/content")
+async def get_company_sie_state_content(
+    company_id: int,
+    user_id: int,
+    db: AsyncSession = Depends(get_async_read_db),
+    accept_encoding: str | None = Header(default=None, alias="Accept-Encoding"),
+    if_none_match: str | None = Header(default=None, alias="If-None-Match"),
+):
+    """
+    Raw SIE content as text/plain. When the stored codec is gzip and the client
+    accepts gzip, the stored bytes are sent as-is with Content-Encoding: gzip.
+    """
+    await require_company_access_async(db, company_id, user_id)
+    state = await _get_sie_state_async(db, company_id, with_content=False)
+    if not state:
+        raise HTTPException(status_code=404, detail="No SIE state for this company")
+
+    accepts_gzip = _accepts_gzip(accept_encoding)
+    etag = _sie_state_etag(state.company_id, state.version, accepts_gzip and state.sie_content_codec == "gzip")
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Accept-Encoding"}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    await _load_sie_content_async(db, state)
+
+    send_gzip = accepts_gzip and state.sie_content_codec == "gzip" and state.sie_content_compressed is not None
+    headers["ETag"] = _sie_state_etag(state.company_id, state.version, send_gzip)
+    if send_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(
+            content=bytes(state.sie_content_compressed),
+            media_type="text/plain; charset=utf-8",
+            headers=headers,
+        )
+
+    return Response(content=_get_sie_content(state), media_type="text/plain; charset=utf-8", headers=headers)
+
+
+def _require_sie_write_lock(db: Session, company_id: int, user_id: int, membership: CompanyMember) -> None:
     # require lock (or allow OWNER/ADMIN to break)
-    lock = _cleanup_expired_lock(db, company_id)
+    lock = _get_live_lock(db, company_id)
     if lock:
-        if lock.locked_by_user_id != payload.user_id:
+        if lock.locked_by_user_id != user_id:
             # allow OWNER/ADMIN to force update (optional, but useful)
             if membership.role not in ("OWNER", "ADMIN"):
-                u = db.query(User).filter(User.id == lock.locked_by_user_id).first()
                 raise HTTPException(
                     status_code=409,
                     detail={
                         "message": "Company is locked by another user",
-                        "lockedBy": {"id": u.id, "email": u.email, "name": u.name} if u else {"id": lock.locked_by_user_id},
+                        "lockedBy": _locked_by(lock),
                         "expiresAt": lock.expires_at.isoformat(),
                     },
                 )
@@ -791,52 +1199,349 @@ def upsert_company_sie_state(company_id: int, payload: CompanySIEStateUpsert, db
             detail={"message": "Company is not locked. Lock it before updating SIE."},
         )
 
-    state = db.query(CompanySIEState).filter(CompanySIEState.company_id == company_id).first()
+
+SIE_SNAPSHOT_INTERVAL = max(1, int(os.getenv("SIE_SNAPSHOT_INTERVAL", "50")))
+
+
+def _record_sie_revision(
+    db: Session,
+    company_id: int,
+    version: int,
+    old_content: str | None,
+    new_content: str,
+    user_id: int,
+) -> None:
+    """
+    Append the revision for `version`. Stored as a delta against version - 1 when
+    that revision exists and the last snapshot is less than SIE_SNAPSHOT_INTERVAL
+    versions back, otherwise as a full snapshot.
+    """
+    latest_version, last_snapshot_version = (
+        db.query(
+            func.max(CompanySIERevision.version),
+            func.max(CompanySIERevision.version).filter(CompanySIERevision.kind == "SNAPSHOT"),
+        )
+        .filter(CompanySIERevision.company_id == company_id)
+        .one()
+    )
+
+    delta = None
+    if (
+        old_content is not None
+        and latest_version == version - 1
+        and last_snapshot_version is not None
+        and version - last_snapshot_version < SIE_SNAPSHOT_INTERVAL
+    ):
+        delta = diff_sie_content(old_content, new_content)
+
+    db.add(
+        CompanySIERevision(
+            company_id=company_id,
+            version=version,
+            kind="SNAPSHOT" if delta is None else "DELTA",
+            content=new_content if delta is None else json.dumps(delta, ensure_ascii=False, separators=(",", ":")),
+            created_by_user_id=user_id,
+        )
+    )
+
+
+def _materialize_sie_version(db: Session, company_id: int, version: int) -> str | None:
+    snapshot = (
+        db.query(CompanySIERevision)
+        .filter(
+            CompanySIERevision.company_id == company_id,
+            CompanySIERevision.kind == "SNAPSHOT",
+            CompanySIERevision.version <= version,
+        )
+        .order_by(CompanySIERevision.version.desc())
+        .first()
+    )
+    if not snapshot:
+        return None
+
+    deltas = (
+        db.query(CompanySIERevision.content)
+        .filter(
+            CompanySIERevision.company_id == company_id,
+            CompanySIERevision.version > snapshot.version,
+            CompanySIERevision.version <= version,
+        )
+        .order_by(CompanySIERevision.version.asc())
+        .all()
+    )
+    if len(deltas) != version - snapshot.version:
+        # gap in history (e.g. versions saved before history was recorded)
+        return None
+
+    parsed = split_sie_lines(snapshot.content)
+    lines = parsed.lines
+    for (content,) in deltas:
+        lines = apply_line_edits(lines, json.loads(content))
+    parsed.lines = lines
+    return parsed.render()
+
+
+@app.put("/companies/{company_id}/sie-state")
+def upsert_company_sie_state(company_id: int, payload: CompanySIEStateUpsert, db: Session = Depends(get_db)):
+    # must have access
+    membership = require_company_access(db, company_id, payload.user_id)
+    _require_sie_write_lock(db, company_id, payload.user_id, membership)
+
+    state = (
+        db.query(CompanySIEState)
+        .filter(CompanySIEState.company_id == company_id)
+        .with_for_update()
+        .first()
+    )
     if not state:
         state = CompanySIEState(
             company_id=company_id,
-            sie_content=payload.sie_content,
             version=1,
             updated_by_user_id=payload.user_id,
         )
+        _set_sie_content(state, payload.sie_content)
         db.add(state)
+        _record_sie_revision(db, company_id, 1, None, payload.sie_content, payload.user_id)
+        _sync_ledger(db, state, None, payload.sie_content)
         db.commit()
         db.refresh(state)
         return {"id": state.id, "companyId": state.company_id, "version": state.version}
 
-    state.sie_content = payload.sie_content
+    old_content = _get_sie_content(state)
+    _set_sie_content(state, payload.sie_content)
     state.version = (state.version or 1) + 1
     state.updated_by_user_id = payload.user_id
+    _record_sie_revision(db, company_id, state.version, old_content, payload.sie_content, payload.user_id)
+    _sync_ledger(db, state, old_content, payload.sie_content)
     db.commit()
     db.refresh(state)
     return {"id": state.id, "companyId": state.company_id, "version": state.version}
 
 
+@app.patch("/companies/{company_id}/sie-state")
+def patch_company_sie_state(company_id: int, payload: CompanySIEStatePatch, db: Session = Depends(get_db)):
+    """
+    Apply line-level and/or voucher-level edits against base_version instead of
+    resending the whole file. Line edits are applied first, then voucher edits.
+    """
+    membership = require_company_access(db, company_id, payload.user_id)
+    _require_sie_write_lock(db, company_id, payload.user_id, membership)
+
+    state = (
+        db.query(CompanySIEState)
+        .filter(CompanySIEState.company_id == company_id)
+        .with_for_update()
+        .first()
+    )
+    if not state:
+        raise HTTPException(status_code=404, detail="No SIE state for this company")
+
+    if state.version != payload.base_version:
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "message": "SIE state has changed since base_version",
+                "version": state.version,
+            },
+        )
+
+    try:
+        old_content = _get_sie_content(state)
+        new_content = apply_sie_patch(
+            old_content,
+            [e.model_dump() for e in payload.line_edits],
+            [e.model_dump() for e in payload.voucher_edits],
+        )
+    except SIEPatchError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    _set_sie_content(state, new_content)
+    state.version = (state.version or 1) + 1
+    state.updated_by_user_id = payload.user_id
+    _record_sie_revision(db, company_id, state.version, old_content, new_content, payload.user_id)
+    _sync_ledger(db, state, old_content, new_content)
+    db.commit()
+    db.refresh(state)
+    return {"id": state.id, "companyId": state.company_id, "version": state.version}
+
+
+@app.get("/companies/{company_id}/sie-state/revisions")
+def list_company_sie_revisions(company_id: int, user_id: int, db: Session = Depends(get_db)):
+    require_company_access(db, company_id, user_id)
+    rows = (
+        db.query(
+            CompanySIERevision.version,
+            CompanySIERevision.kind,
+            CompanySIERevision.created_at,
+            CompanySIERevision.created_by_user_id,
+        )
+        .filter(CompanySIERevision.company_id == company_id)
+        .order_by(CompanySIERevision.version.desc())
+        .all()
+    )
+    return [
+        {
+            "version": r.version,
+            "kind": r.kind,
+            "createdAt": r.created_at.isoformat() if r.created_at else None,
+            "createdByUserId": r.created_by_user_id,
+        }
+        for r in rows
+    ]
+
+
+@app.get("/companies/{company_id}/sie-state/revisions/{version}")
+def get_company_sie_revision(company_id: int, version: int, user_id: int, db: Session = Depends(get_db)):
+    require_company_access(db, company_id, user_id)
+    content = _materialize_sie_version(db, company_id, version)
+    if content is None:
+        raise HTTPException(status_code=404, detail="Revision not found")
+    return {"companyId": company_id, "version": version, "sieContent": content}
+
+
 # ------------------------------------------------------------
-# Customers
+# Ledger (normalized from SIE state)
 # ------------------------------------------------------------
-@app.get("/customers")
-def list_customers(user_id: int, db: Session = Depends(get_db)):
-    customers = db.query(Customer).filter(Customer.user_id == user_id).all()
+@app.get("/companies/{company_id}/ledger/vouchers")
+def list_ledger_vouchers(
+    company_id: int,
+    user_id: int,
+    from_date: date | None = None,
+    to_date: date | None = None,
+    db: Session = Depends(get_db),
+):
+    require_company_access(db, company_id, user_id)
+    query = db.query(LedgerVoucher).filter(LedgerVoucher.company_id == company_id)
+    if from_date:
+        query = query.filter(LedgerVoucher.date >= from_date)
+    if to_date:
+        query = query.filter(LedgerVoucher.date <= to_date)
+    vouchers = query.order_by(LedgerVoucher.date, LedgerVoucher.series, LedgerVoucher.id).all()
+
+    voucher_ids = [v.id for v in vouchers]
+    lines_by_voucher: dict[int, list] = {vid: [] for vid in voucher_ids}
+    if voucher_ids:
+        lines = (
+            db.query(LedgerTransaction)
+            .filter(LedgerTransaction.voucher_id.in_(voucher_ids))
+            .order_by(LedgerTransaction.voucher_id, LedgerTransaction.line_no)
+            .all()
+        )
+        for t in lines:
+            lines_by_voucher[t.voucher_id].append(t)
+
     return [
         {
-            "id": c.id,
-            "user_id": c.user_id,
-            "company_id": c.company_id,
-            "type": c.type,
-            "name": c.name,
-            "organizationNumber": c.organization_number,
-            "email": c.email,
-            "phone": c.phone,
-            "address": c.address,
-            "postalCode": c.postal_code,
-            "city": c.city,
-            "country": c.country,
+            "id": v.id,
+            "series": v.series,
+            "number": v.number,
+            "date": v.date.isoformat(),
+            "text": v.text,
+            "transactions": [
+                {
+                    "account": t.account,
+                    "amount": str(t.amount),
+                    "date": t.date.isoformat(),
+                    "objects": t.objects,
+                    "text": t.text,
+                }
+                for t in lines_by_voucher[v.id]
+            ],
         }
-        for c in customers
+        for v in vouchers
     ]
 
 
+@app.get("/companies/{company_id}/ledger/accounts/{account}/balance")
+def get_ledger_account_balance(
+    company_id: int,
+    account: str,
+    user_id: int,
+    to_date: date | None = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Balance of one account within the fiscal year (#RAR) containing to_date (the latest
+    year without to_date): its opening balance (IB, 0 for result accounts) plus all
+    transactions from the year start up to to_date.
+    """
+    require_company_access(db, company_id, user_id)
+    to_date = to_date or date.max
+
+    # the latest year starting on or before to_date; years don't overlap
+    from_date = db.scalar(
+        select(LedgerFiscalYear.start_date)
+        .where(LedgerFiscalYear.company_id == company_id, LedgerFiscalYear.start_date <= to_date)
+        .order_by(LedgerFiscalYear.start_date.desc())
+        .limit(1)
+    )
+    ib_query = db.query(LedgerAccountBalance.period, LedgerAccountBalance.amount).filter(
+        LedgerAccountBalance.company_id == company_id,
+        LedgerAccountBalance.account == account,
+        LedgerAccountBalance.kind == "IB",
+    )
+    if from_date is not None:
+        ib = ib_query.filter(LedgerAccountBalance.period == from_date).first()
+    else:
+        # no #RAR years in the file: count from the latest IB (or from the beginning)
+        ib = ib_query.filter(LedgerAccountBalance.period <= to_date).order_by(LedgerAccountBalance.period.desc()).first()
+        from_date = ib.period if ib else date.min
+    opening = ib.amount if ib else 0
+
+    movement = (
+        db.query(func.coalesce(func.sum(LedgerTransaction.amount), 0))
+        .filter(
+            LedgerTransaction.company_id == company_id,
+            LedgerTransaction.account == account,
+            LedgerTransaction.date >= from_date,
+            LedgerTransaction.date <= to_date,
+        )
+        .scalar()
+    )
+    return {
+        "companyId": company_id,
+        "account": account,
+        "openingBalance": str(opening),
+        "openingDate": ib.period.isoformat() if ib else None,
+        "movement": str(movement),
+        "balance": str(opening + movement),
+    }
+
+
+@app.get("/companies/{company_id}/ledger/accounts/{account}/periods")
+def list_ledger_account_periods(company_id: int, account: str, user_id: int, db: Session = Depends(get_db)):
+    require_company_access(db, company_id, user_id)
+    rows = (
+        db.query(LedgerAccountBalance.kind, LedgerAccountBalance.period, LedgerAccountBalance.amount)
+        .filter(LedgerAccountBalance.company_id == company_id, LedgerAccountBalance.account == account)
+        .order_by(LedgerAccountBalance.period, LedgerAccountBalance.kind)
+        .all()
+    )
+    return [{"kind": r.kind, "period": r.period.isoformat(), "amount": str(r.amount)} for r in rows]
+
+
+# ------------------------------------------------------------
+# Customers
+# ------------------------------------------------------------
+@app.get("/customers")
+def list_customers(user_id: int, page: PageParams = Depends(), db: Session = Depends(get_db)):
+    stmt = select(
+        Customer.id,
+        Customer.user_id,
+        Customer.company_id,
+        Customer.type,
+        Customer.name,
+        Customer.organization_number.label("organizationNumber"),
+        Customer.email,
+        Customer.phone,
+        Customer.address,
+        Customer.postal_code.label("postalCode"),
+        Customer.city,
+        Customer.country,
+    ).where(Customer.user_id == user_id)
+    return _paginate(db, stmt, Customer.id, "id", page)
+
+
 @app.post("/customers")
 def create_customer(payload: CustomerCreate, db: Session = Depends(get_db)):
     customer = Customer(
@@ -890,22 +1595,19 @@ def delete_customer(customer_id: int, db: Session = Depends(get_db)):
 # Products
 # ------------------------------------------------------------
 @app.get("/products")
-def list_products(user_id: int, db: Session = Depends(get_db)):
-    products = db.query(Product).filter(Product.user_id == user_id).all()
-    return [
-        {
-            "id": p.id,
-            "user_id": p.user_id,
-            "company_id": p.company_id,
-            "name": p.name,
-            "description": p.description,
-            "price": p.price,
-            "includesVat": p.includes_vat,
-            "vatRate": p.vat_rate,
-            "unit": p.unit,
-        }
-        for p in products
-    ]
+def list_products(user_id: int, page: PageParams = Depends(), db: Session = Depends(get_db)):
+    stmt = select(
+        Product.id,
+        Product.user_id,
+        Product.company_id,
+        Product.name,
+        Product.description,
+        Product.price,
+        Product.includes_vat.label("includesVat"),
+        Product.vat_rate.label("vatRate"),
+        Product.unit,
+    ).where(Product.user_id == user_id)
+    return _paginate(db, stmt, Product.id, "id", page)
 
 
 @app.post("/products")
@@ -975,6 +1677,7 @@ def join_company_by_orgnr(payload: JoinCompanyByOrgNumber, db: Session = Depends
     membership = CompanyMember(company_id=company.id, user_id=payload.user_id, role="MEMBER", status="ACTIVE")
     db.add(membership)
     db.commit()
+    membership_cache.invalidate(company.id, payload.user_id)
     return {"success": True, "companyId": company.id, "alreadyMember": False}
 
 
@@ -1019,44 +1722,42 @@ def get_company_by_orgnr(organization_number: str, user_id: int, db: Session = D
 
 
 @app.get("/companies/{company_id}/members")
-def list_company_members(company_id: int, user_id: int, db: Session = Depends(get_db)):
+def list_company_members(company_id: int, user_id: int, page: PageParams = Depends(), db: Session = Depends(get_db)):
     require_company_access(db, company_id, user_id)
-    rows = (
-        db.query(CompanyMember, User)
+    stmt = (
+        select(User.id.label("userId"), User.email, User.name, CompanyMember.role, CompanyMember.status)
         .join(User, User.id == CompanyMember.user_id)
-        .filter(CompanyMember.company_id == company_id)
-        .all()
+        .where(CompanyMember.company_id == company_id)
     )
-    return [{"userId": u.id, "email": u.email, "name": u.name, "role": m.role, "status": m.status} for (m, u) in rows]
+    return _paginate(db, stmt, CompanyMember.user_id, "userId", page)
 
 
 # ------------------------------------------------------------
 # Companies
 # ------------------------------------------------------------
-@app.get("/companies")
-def list_companies(user_id: int, db: Session = Depends(get_db)):
-    memberships = db.query(CompanyMember).filter(CompanyMember.user_id == user_id, CompanyMember.status == "ACTIVE").all()
-    company_ids = [m.company_id for m in memberships]
-    if not company_ids:
-        return []
+_COMPANY_LIST_COLUMNS = (
+    Company.id,
+    Company.company_name.label("companyName"),
+    Company.organization_number.label("organizationNumber"),
+    Company.address,
+    Company.postal_code.label("postalCode"),
+    Company.city,
+    Company.country,
+    Company.vat_number.label("vatNumber"),
+    Company.fiscal_year_start.label("fiscalYearStart"),
+    Company.fiscal_year_end.label("fiscalYearEnd"),
+    Company.accounting_standard.label("accountingStandard"),
+)
 
-    companies = db.query(Company).filter(Company.id.in_(company_ids)).all()
-    return [
-        {
-            "id": company.id,
-            "companyName": company.company_name,
-            "organizationNumber": company.organization_number,
-            "address": company.address,
-            "postalCode": company.postal_code,
-            "city": company.city,
-            "country": company.country,
-            "vatNumber": company.vat_number,
-            "fiscalYearStart": company.fiscal_year_start,
-            "fiscalYearEnd": company.fiscal_year_end,
-            "accountingStandard": company.accounting_standard,
-        }
-        for company in companies
-    ]
+
+@app.get("/companies")
+def list_companies(user_id: int, page: PageParams = Depends(), db: Session = Depends(get_db)):
+    stmt = (
+        select(*_COMPANY_LIST_COLUMNS)
+        .join(CompanyMember, CompanyMember.company_id == Company.id)
+        .where(CompanyMember.user_id == user_id, CompanyMember.status == "ACTIVE")
+    )
+    return _paginate(db, stmt, Company.id, "id", page)
 
 
 @app.post("/companies")
@@ -1088,6 +1789,7 @@ def create_company(payload: CompanyCreate, db: Session = Depends(get_db)):
     membership = CompanyMember(company_id=company.id, user_id=payload.user_id, role="OWNER", status="ACTIVE")
     db.add(membership)
     db.commit()
+    membership_cache.invalidate(company.id, payload.user_id)
 
     return {"id": company.id}
     
@@ -1258,6 +1960,7 @@ def decide_company_join_request(request_id: int, payload: CompanyJoinRequestDeci
         req.decided_at = now
         req.decided_by_user_id = payload.user_id
         db.commit()
+        membership_cache.invalidate(req.company_id, req.requester_user_id)
 
         return {
             'success': True,
@@ -1281,33 +1984,18 @@ def decide_company_join_request(request_id: int, payload: CompanyJoinRequestDeci
     
     
 @app.get("/companies/for-user")
-def list_companies_for_user(user_id: int, db: Session = Depends(get_db)):
-    rows = (
-        db.query(Company, CompanyMember)
+def list_companies_for_user(user_id: int, page: PageParams = Depends(), db: Session = Depends(get_db)):
+    stmt = (
+        select(
+            *_COMPANY_LIST_COLUMNS,
+            CompanyMember.role.label('memberRole'),
+            CompanyMember.status.label('memberStatus'),
+        )
         .join(CompanyMember, CompanyMember.company_id == Company.id)
-        .filter(CompanyMember.user_id == user_id)
-        .filter(CompanyMember.status == 'ACTIVE')
-        .all()
+        .where(CompanyMember.user_id == user_id)
+        .where(CompanyMember.status == 'ACTIVE')
     )
-
-    return [
-        {
-            'id': c.id,
-            'companyName': c.company_name,
-            'organizationNumber': c.organization_number,
-            'address': c.address,
-            'postalCode': c.postal_code,
-            'city': c.city,
-            'country': c.country,
-            'vatNumber': c.vat_number,
-            'fiscalYearStart': c.fiscal_year_start,
-            'fiscalYearEnd': c.fiscal_year_end,
-            'accountingStandard': c.accounting_standard,
-            'memberRole': m.role,
-            'memberStatus': m.status,
-        }
-        for (c, m) in rows
-    ]
+    return _paginate(db, stmt, Company.id, 'id', page)
 
 
 @app.put("/companies/{company_id}")
@@ -1344,10 +2032,15 @@ def delete_company(company_id: int, user_id: int, db: Session = Depends(get_db))
     if not company:
         raise HTTPException(status_code=404, detail="Company not found")
 
+    db.query(LedgerAccountBalance).filter(LedgerAccountBalance.company_id == company_id).delete()
+    db.query(LedgerTransaction).filter(LedgerTransaction.company_id == company_id).delete()
+    db.query(LedgerVoucher).filter(LedgerVoucher.company_id == company_id).delete()
+    db.query(CompanySIERevision).filter(CompanySIERevision.company_id == company_id).delete()
     db.query(CompanySIEState).filter(CompanySIEState.company_id == company_id).delete()
     db.query(CompanyMember).filter(CompanyMember.company_id == company_id).delete()
     db.delete(company)
     db.commit()
+    membership_cache.invalidate(company_id=company_id)
     return {"success": True}
     
     
@@ -1382,6 +2075,7 @@ def approve_join_request(company_id: int, member_user_id: int, payload: dict, db
 
     membership.status = 'ACTIVE'
     db.commit()
+    membership_cache.invalidate(company_id, member_user_id)
     return {'success': True}
 
 
@@ -1399,4 +2093,5 @@ def remove_member(company_id: int, member_user_id: int, user_id: int, db: Sessio
 
     db.delete(membership)
     db.commit()
+    membership_cache.invalidate(company_id, member_user_id)
     return {'success': True}
@@ -0,0 +1,77 @@
+"""
+Short-lived, per-process cache of company memberships keyed by (company_id, user_id).
+
+Polling endpoints (lock, heartbeat, takeover requests, sie-state) all start with an
+access check; caching the membership row for a few seconds keeps those from hitting
+Postgres for authorization on every call. Missing memberships are cached too.
+
+Handlers that add, remove or change memberships call invalidate() after commit.
+Other workers are not notified and see the change within the TTL.
+"""
+
+import os
+import threading
+import time
+from typing import NamedTuple
+
+MEMBERSHIP_CACHE_TTL_SECONDS = max(0.0, float(os.getenv("MEMBERSHIP_CACHE_TTL_SECONDS", "5")))
+MEMBERSHIP_CACHE_MAX_ENTRIES = 10000
+
+
+class MembershipInfo(NamedTuple):
+    """Detached snapshot of a CompanyMember row (safe to share across sessions)."""
+    company_id: int
+    user_id: int
+    role: str
+    status: str
+
+
+class MembershipCache:
+    def __init__(self, ttl_seconds: float = MEMBERSHIP_CACHE_TTL_SECONDS, max_entries: int = MEMBERSHIP_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: dict[tuple[int, int], tuple[float, MembershipInfo | None]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, company_id: int, user_id: int) -> tuple[bool, MembershipInfo | None]:
+        """(hit, value); value is None for a cached "not a member"."""
+        key = (company_id, user_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return False, None
+            return True, value
+
+    def set(self, company_id: int, user_id: int, value: MembershipInfo | None) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._evict_expired()
+                if len(self._entries) >= self.max_entries:
+                    self._entries.clear()
+            self._entries[(company_id, user_id)] = (time.monotonic() + self.ttl_seconds, value)
+
+    def invalidate(self, company_id: int | None = None, user_id: int | None = None) -> None:
+        """Drop one entry, all entries of a company or of a user, or everything."""
+        with self._lock:
+            if company_id is not None and user_id is not None:
+                self._entries.pop((company_id, user_id), None)
+                return
+            if company_id is None and user_id is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if k[0] == company_id or k[1] == user_id]:
+                del self._entries[key]
+
+    def _evict_expired(self) -> None:
+        now = time.monotonic()
+        for key in [k for k, (expires, _) in self._entries.items() if expires <= now]:
+            del self._entries[key]
+
+
+membership_cache = MembershipCache()
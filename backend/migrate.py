@@ -0,0 +1,148 @@
+"""
+Alembic migrations, run once per deploy instead of in every API worker.
+
+    python migrate.py            # wait for the DB, upgrade to head, exit
+
+API workers check the schema on startup according to MIGRATIONS_ON_STARTUP:
+
+    verify   compare alembic_version with this build's head (one query); default
+    upgrade  upgrade to head like `python migrate.py` (no-op once at head)
+    off      skip the check
+
+Upgrades take a Postgres advisory lock, so concurrent runs (several migrate jobs,
+or workers with MIGRATIONS_ON_STARTUP=upgrade) apply each migration once: the
+others wait for the lock, see the schema at head and return.
+"""
+
+import logging
+import os
+import time
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from database import DATABASE_URL, MIGRATION_ADVISORY_LOCK, engine
+
+logger = logging.getLogger("snug-api")
+
+MIGRATIONS_ON_STARTUP = os.getenv("MIGRATIONS_ON_STARTUP", "verify").strip().lower()
+
+STARTUP_MODES = ("verify", "upgrade", "off")
+if MIGRATIONS_ON_STARTUP not in STARTUP_MODES:
+    raise RuntimeError(f"MIGRATIONS_ON_STARTUP must be one of {STARTUP_MODES}")
+
+
+def alembic_config() -> Config:
+    cfg = Config(str(Path(__file__).with_name("alembic.ini")))
+    cfg.set_main_option("script_location", str(Path(__file__).parent / "alembic"))
+    cfg.set_main_option("sqlalchemy.url", DATABASE_URL)
+    cfg.attributes["configure_logger"] = False
+    return cfg
+
+
+def head_revisions(cfg: Config) -> set[str]:
+    return set(ScriptDirectory.from_config(cfg).get_heads())
+
+
+def current_revisions(connection) -> set[str]:
+    """Revisions stamped in alembic_version; empty if the table doesn't exist yet."""
+    try:
+        return set(connection.execute(text("SELECT version_num FROM alembic_version")).scalars())
+    except DBAPIError:
+        connection.rollback()
+        return set()
+
+
+def wait_for_db(max_attempts: int = 45, delay_seconds: int = 2) -> None:
+    last_exc: Exception | None = None
+    for _ in range(max_attempts):
+        try:
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+            logger.info("DB is ready.")
+            return
+        except Exception as exc:
+            last_exc = exc
+            logger.info("Waiting for DB...")
+            time.sleep(delay_seconds)
+    logger.exception("DB not ready after retries")
+    if last_exc:
+        raise last_exc
+    raise RuntimeError("DB not ready")
+
+
+def ensure_alembic_version_table(connection) -> None:
+    """
+    Ensure alembic_version exists and its version_num can hold long revision IDs.
+    """
+    connection.execute(
+        text("CREATE TABLE IF NOT EXISTS alembic_version (version_num VARCHAR(128) NOT NULL PRIMARY KEY);")
+    )
+    # If someone created it with VARCHAR(32) earlier, expand it
+    try:
+        with connection.begin_nested():
+            connection.execute(text("ALTER TABLE alembic_version ALTER COLUMN version_num TYPE VARCHAR(128);"))
+    except Exception:
+        pass
+    connection.commit()
+
+
+def verify_schema_revision() -> None:
+    """Raise if the database isn't at this build's Alembic head."""
+    heads = head_revisions(alembic_config())
+    with engine.connect() as connection:
+        current = current_revisions(connection)
+    if current != heads:
+        raise RuntimeError(
+            f"Database schema is at {sorted(current) or 'no revision'}, this build expects {sorted(heads)}; "
+            "run `python migrate.py`."
+        )
+    logger.info("Database schema at head %s.", ", ".join(sorted(heads)))
+
+
+def run_migrations_to_head() -> None:
+    cfg = alembic_config()
+    heads = head_revisions(cfg)
+    with engine.connect() as connection:
+        if current_revisions(connection) == heads:
+            logger.info("Database schema already at head.")
+            return
+
+        is_postgres = connection.dialect.name == "postgresql"
+        namespace, lock_id = MIGRATION_ADVISORY_LOCK
+        lock_key = {"namespace": namespace, "lock_id": lock_id}
+        if is_postgres:
+            logger.info("Waiting for migration lock...")
+            connection.execute(text("SELECT pg_advisory_lock(:namespace, :lock_id)"), lock_key)
+            connection.commit()
+        try:
+            # another process may have finished the upgrade while we waited
+            if current_revisions(connection) == heads:
+                logger.info("Database schema already at head.")
+                return
+            ensure_alembic_version_table(connection)
+            logger.info("Running migrations to head...")
+            command.upgrade(cfg, "head")
+            logger.info("Migrations complete.")
+        finally:
+            if is_postgres:
+                # session-level lock: release it before the connection goes back to the pool
+                connection.execute(text("SELECT pg_advisory_unlock(:namespace, :lock_id)"), lock_key)
+                connection.commit()
+
+
+def run_startup_migrations() -> None:
+    if MIGRATIONS_ON_STARTUP == "upgrade":
+        run_migrations_to_head()
+    elif MIGRATIONS_ON_STARTUP == "verify":
+        verify_schema_revision()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    wait_for_db()
+    run_migrations_to_head()
@@ -4,16 +4,19 @@ from sqlalchemy import (
     Column,
     Integer,
     String,
+    Date,
     DateTime,
     ForeignKey,
     Text,
     Float,
     Boolean,
+    LargeBinary,
+    Numeric,
     UniqueConstraint,
     Index,
 )
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from sqlalchemy import Enum as SAEnum
 from datetime import datetime
 
@@ -149,6 +152,10 @@ class CompanyLockTakeoverRequest(Base):
         SAEnum(
             CompanyLockTakeoverStatus,
             name="company_lock_takeover_status",
+            # the column is VARCHAR(20) (migration 0010), not a native Postgres enum;
+            # asyncpg casts bind params to the declared type, so this must match
+            native_enum=False,
+            length=20,
         ),
         nullable=False,
         default=CompanyLockTakeoverStatus.PENDING,
@@ -174,11 +181,14 @@ class CompanyLockTakeoverRequest(Base):
     decided_by = relationship("User", foreign_keys=[decided_by_user_id])
 
     __table_args__ = (
-        UniqueConstraint(
+        # at most one PENDING request per user and company; decided rows are kept for history
+        Index(
+            "uq_takeover_company_user_pending",
             "company_id",
             "requested_by_user_id",
-            "status",
-            name="uq_takeover_company_user_status",
+            unique=True,
+            postgresql_where=text("status = 'PENDING'"),
+            sqlite_where=text("status = 'PENDING'"),
         ),
     )
 
@@ -254,13 +264,130 @@ class CompanySIEState(Base):
     id = Column(Integer, primary_key=True, index=True)
     company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
 
-    sie_content = Column(Text, nullable=False)
+    # Legacy plain-text storage. New writes go to sie_content_compressed and leave this NULL.
+    sie_content = Column(Text, nullable=True)
+
+    # Compressed content + codec tag (see sie.SIE_CODECS)
+    sie_content_compressed = Column(LargeBinary, nullable=True)
+    sie_content_codec = Column(String(10), nullable=True)
 
     # optimistic version number (will be used later for conflict prevention)
     version = Column(Integer, nullable=False, default=1)
 
     updated_by_user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # version whose content the ledger tables (vouchers, transactions, account_balances)
+    # mirror; anything else (NULL: never built) makes the next save rebuild them
+    ledger_version = Column(Integer, nullable=True)
+
+
+class LedgerVoucher(Base):
+    """
+    Vouchers (#VER) mirrored from CompanySIEState so the ledger can be queried
+    without reparsing the SIE file. Kept in step with each save by ledger.sync_company_ledger,
+    which rewrites only the vouchers that changed.
+    """
+    __tablename__ = "vouchers"
+    __table_args__ = (
+        UniqueConstraint("company_id", "series", "number", name="uq_vouchers_company_series_number"),
+        Index("ix_vouchers_company_date", "company_id", "date"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    company_id = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), nullable=False)
+    series = Column(String(20), nullable=False)
+    number = Column(String(20), nullable=False)
+    date = Column(Date, nullable=False)
+    text = Column(Text, nullable=True)
+
+    transactions = relationship("LedgerTransaction", back_populates="voucher", order_by="LedgerTransaction.line_no")
+
+
+class LedgerTransaction(Base):
+    """
+    Transaction lines (#TRANS). `date` is the line's own date or, if missing, the voucher date.
+    """
+    __tablename__ = "transactions"
+    __table_args__ = (
+        Index("ix_transactions_company_account_date", "company_id", "account", "date"),
+        Index("ix_transactions_voucher_id", "voucher_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    company_id = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), nullable=False)
+    voucher_id = Column(Integer, ForeignKey("vouchers.id", ondelete="CASCADE"), nullable=False)
+    line_no = Column(Integer, nullable=False)
+    account = Column(String(20), nullable=False)
+    amount = Column(Numeric(18, 2), nullable=False)
+    date = Column(Date, nullable=False)
+    objects = Column(Text, nullable=True)
+    text = Column(Text, nullable=True)
+
+    voucher = relationship("LedgerVoucher", back_populates="transactions")
+
+
+class LedgerAccountBalance(Base):
+    """
+    Per-account balances:
+    - IB: opening balance (#IB), period = first day of that fiscal year
+    - MOVEMENT: sum of transactions in the month starting at period
+    """
+    __tablename__ = "account_balances"
+    __table_args__ = (
+        UniqueConstraint("company_id", "account", "kind", "period", name="uq_account_balances_company_account_kind_period"),
+        Index("ix_account_balances_company_account_period", "company_id", "account", "period"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    company_id = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), nullable=False)
+    account = Column(String(20), nullable=False)
+    kind = Column(String(10), nullable=False)
+    period = Column(Date, nullable=False)
+    amount = Column(Numeric(18, 2), nullable=False)
+
+
+class LedgerFiscalYear(Base):
+    """
+    Fiscal years (#RAR) of the company SIE state. `year` is the SIE year index
+    (0 = current, -1 = previous, ...).
+    """
+    __tablename__ = "fiscal_years"
+    __table_args__ = (
+        UniqueConstraint("company_id", "year", name="uq_fiscal_years_company_year"),
+        Index("ix_fiscal_years_company_start_date", "company_id", "start_date"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    company_id = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), nullable=False)
+    year = Column(Integer, nullable=False)
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=False)
+
+
+class CompanySIERevision(Base):
+    """
+    Append-only history of CompanySIEState.
+    Each version is either a full SNAPSHOT or a DELTA (JSON line hunks against the
+    previous version). A snapshot is written at least every N versions so that
+    materializing any version needs one snapshot plus at most N-1 deltas.
+    """
+    __tablename__ = "company_sie_revisions"
+    __table_args__ = (
+        UniqueConstraint("company_id", "version", name="uq_company_sie_revisions_company_version"),
+        Index("ix_company_sie_revisions_company_kind_version", "company_id", "kind", "version"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    company_id = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), nullable=False)
+    version = Column(Integer, nullable=False)
+
+    # SNAPSHOT or DELTA
+    kind = Column(String(10), nullable=False)
+    content = Column(Text, nullable=False)
+
+    created_by_user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     
     
 class CompanyJoinRequestStatus(str, enum.Enum):
@@ -0,0 +1,146 @@
+"""
+Password hashing off the request threadpool.
+
+bcrypt costs 100-300 ms of CPU per hash/verify. Running it inline in sync handlers
+let a login burst occupy every threadpool thread and starve unrelated requests (lock
+heartbeats, polling). Auth handlers instead await hash_password_async /
+verify_password_async, which run bcrypt in a small dedicated process pool:
+
+- PASSWORD_HASH_WORKERS (default min(2, cpu count)) processes do the hashing, so
+  auth never takes more than that many cores.
+- PASSWORD_HASH_MAX_QUEUE (default 64) jobs may wait for a worker; beyond that
+  PasswordHasherBusy is raised at once instead of queueing without bound (main.py
+  answers it with 503 + Retry-After).
+
+Queue depth, in-flight jobs, wait/hash time and rejections are exported via /metrics.
+This module is imported by the worker processes, so keep its imports light.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from passlib.context import CryptContext
+
+from metrics import Counter, Gauge, Histogram
+
+PASSWORD_HASH_WORKERS = max(1, int(os.getenv("PASSWORD_HASH_WORKERS", str(min(2, os.cpu_count() or 1)))))
+PASSWORD_HASH_MAX_QUEUE = max(0, int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64")))
+PASSWORD_HASH_RETRY_AFTER_SECONDS = 1
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+_HASH_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.0, 5.0, 10.0)
+
+PASSWORD_HASH_QUEUE_DEPTH = Gauge("snug_password_hash_queue_depth", "Password hash jobs waiting for a worker")
+PASSWORD_HASH_IN_FLIGHT = Gauge("snug_password_hash_in_flight", "Password hash jobs running in a worker")
+PASSWORD_HASH_WAIT_SECONDS = Histogram(
+    "snug_password_hash_wait_seconds", "Time a password hash job waited for a worker", buckets=_HASH_BUCKETS
+)
+PASSWORD_HASH_SECONDS = Histogram(
+    "snug_password_hash_seconds", "Time spent hashing/verifying in a worker", ("operation",), buckets=_HASH_BUCKETS
+)
+PASSWORD_HASH_REJECTED = Counter("snug_password_hash_rejected_total", "Password hash jobs rejected because the queue was full")
+
+
+class PasswordHasherBusy(Exception):
+    """Too many password jobs queued; retry after retry_after seconds."""
+
+    def __init__(self, retry_after: int = PASSWORD_HASH_RETRY_AFTER_SECONDS):
+        super().__init__("Too many concurrent password operations, try again shortly")
+        self.retry_after = retry_after
+
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def verify_password(plain: str, hashed: str) -> bool:
+    return pwd_context.verify(plain, hashed)
+
+
+# Run in the worker process; wall-clock timestamps so the parent can split wait vs work.
+def _timed_hash(password: str) -> tuple[str, float, float]:
+    started = time.time()
+    return hash_password(password), started, time.time()
+
+
+def _timed_verify(plain: str, hashed: str) -> tuple[bool, float, float]:
+    started = time.time()
+    return verify_password(plain, hashed), started, time.time()
+
+
+class PasswordHasherPool:
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_queue: int = PASSWORD_HASH_MAX_QUEUE):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._pending = 0  # submitted, not finished (queued + running)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: never fork a process that has DB connections and threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _update_gauges(self) -> None:
+        PASSWORD_HASH_IN_FLIGHT.set(min(self._pending, self.workers))
+        PASSWORD_HASH_QUEUE_DEPTH.set(max(0, self._pending - self.workers))
+
+    def _reserve(self) -> None:
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                PASSWORD_HASH_REJECTED.inc()
+                raise PasswordHasherBusy()
+            self._pending += 1
+            self._update_gauges()
+
+    def _release(self) -> None:
+        with self._lock:
+            self._pending -= 1
+            self._update_gauges()
+
+    async def _run(self, operation: str, fn, *args):
+        self._reserve()
+        submitted = time.time()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        # release when the worker is done, even if the request was cancelled meanwhile
+        future.add_done_callback(lambda _: self._release())
+        result, started, finished = await asyncio.wrap_future(future)
+        PASSWORD_HASH_WAIT_SECONDS.observe(max(0.0, started - submitted))
+        PASSWORD_HASH_SECONDS.observe(finished - started, operation=operation)
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", _timed_hash, password)
+
+    async def verify(self, plain: str, hashed: str) -> bool:
+        return await self._run("verify", _timed_verify, plain, hashed)
+
+
+password_hasher = PasswordHasherPool()
+
+
+async def hash_password_async(password: str) -> str:
+    return await password_hasher.hash(password)
+
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    return await password_hasher.verify(plain, hashed)
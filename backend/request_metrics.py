@@ -0,0 +1,212 @@
+"""
+Per-route HTTP metrics for GET /metrics.
+
+RequestMetricsMiddleware is a plain ASGI middleware (no BaseHTTPMiddleware task and
+queue per request). For every HTTP request it records, labelled by method and route
+template (e.g. "/companies/{company_id}/lock/heartbeat"; "<unmatched>" for 404s):
+
+    snug_http_requests_total{method,route,status}
+    snug_http_request_duration_seconds{method,route}   until the last body chunk is sent
+    snug_http_response_size_bytes{method,route}
+    snug_http_request_db_seconds{method,route}         time in cursor.execute on either engine
+    snug_http_request_queries{method,route}            statements executed
+    snug_http_requests_in_flight
+
+Label children are resolved once per (method, route) and cached on the middleware,
+so a request costs a dict lookup, a few perf_counter() calls and bucket increments.
+
+    SLOW_QUERY_MS        log statements that take at least this long, with their route,
+                         bind-parameter types and elapsed time (default 250, 0 disables)
+    SQL_DEBUG_HEADERS    "1" adds X-DB-Query-Count and X-DB-Time-Ms to every response
+                         (debugging only; counts stop when the response starts)
+"""
+
+import logging
+import os
+import re
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+from metrics import Counter, Gauge, Histogram
+
+logger = logging.getLogger("snug-api")
+
+SLOW_QUERY_SECONDS = max(0.0, float(os.getenv("SLOW_QUERY_MS", "250"))) / 1000
+SQL_DEBUG_HEADERS = os.getenv("SQL_DEBUG_HEADERS", "").strip().lower() in ("1", "true", "yes")
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+HTTP_REQUESTS = Counter("snug_http_requests_total", "HTTP requests", ("method", "route", "status"))
+HTTP_REQUEST_SECONDS = Histogram(
+    "snug_http_request_duration_seconds",
+    "Time from receiving the request to sending the last response byte",
+    ("method", "route"),
+)
+HTTP_RESPONSE_BYTES = Histogram(
+    "snug_http_response_size_bytes",
+    "Response body size",
+    ("method", "route"),
+    buckets=(100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000),
+)
+HTTP_REQUEST_DB_SECONDS = Histogram(
+    "snug_http_request_db_seconds",
+    "Time spent executing SQL while handling the request",
+    ("method", "route"),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+HTTP_REQUEST_QUERIES = Histogram(
+    "snug_http_request_queries",
+    "SQL statements executed while handling the request",
+    ("method", "route"),
+    buckets=(0, 1, 2, 3, 4, 6, 8, 12, 20, 50, 100),
+)
+HTTP_IN_FLIGHT = Gauge("snug_http_requests_in_flight", "HTTP requests being handled")
+
+
+def _route_label(scope) -> str:
+    # FastAPI stores the matched APIRoute in the scope during routing
+    route = scope.get("route")
+    return route.path if route is not None else UNMATCHED_ROUTE
+
+
+class RequestTimings:
+    """DB time and statement count of the current request, added up by the cursor hooks."""
+
+    __slots__ = ("scope", "db_seconds", "queries")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.db_seconds = 0.0
+        self.queries = 0
+
+
+# Set per request by the middleware. Threadpool endpoints and SQLAlchemy's asyncio
+# greenlets run in a copy of the request context, which shares this object.
+current_request_timings: ContextVar[RequestTimings | None] = ContextVar("current_request_timings", default=None)
+
+
+def _parameter_types(parameters) -> str:
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{name}: {type(value).__name__}" for name, value in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        # runs of one type are collapsed, so long IN lists stay short: (int x 500, str)
+        runs: list[list] = []
+        for value in parameters:
+            name = type(value).__name__
+            if runs and runs[-1][0] == name:
+                runs[-1][1] += 1
+            else:
+                runs.append([name, 1])
+        return "(" + ", ".join(name if count == 1 else f"{name} x {count}" for name, count in runs) + ")"
+    return type(parameters).__name__
+
+
+def _parameter_shape(parameters, executemany: bool) -> str:
+    """Types of the bind parameters (never their values, which may be personal data)."""
+    if executemany:
+        return f"{len(parameters)} rows of {_parameter_types(parameters[0])}" if parameters else "0 rows"
+    return _parameter_types(parameters)
+
+
+def _log_slow_query(statement: str, parameters, executemany: bool, elapsed: float) -> None:
+    timings = current_request_timings.get()
+    route = f"{timings.scope['method']} {_route_label(timings.scope)}" if timings is not None else "-"
+    logger.warning(
+        "Slow query %.1f ms on %s: %s params=%s",
+        elapsed * 1000,
+        route,
+        re.sub(r"\s+", " ", statement).strip()[:1000],
+        _parameter_shape(parameters, executemany),
+    )
+
+
+def instrument_db_timing(engine) -> None:
+    """Count statements and cursor time on this (sync) engine for the current request; log slow ones."""
+
+    # statements on one connection never overlap, so a single start time per connection
+    # is enough; a failed execute leaves it behind and the next one overwrites it
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_started"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"]
+        timings = current_request_timings.get()
+        if timings is not None:
+            timings.db_seconds += elapsed
+            timings.queries += 1
+        if SLOW_QUERY_SECONDS and elapsed >= SLOW_QUERY_SECONDS:
+            _log_slow_query(statement, parameters, executemany, elapsed)
+
+
+class _RouteMetrics:
+    __slots__ = ("method", "route", "duration", "size", "db", "queries", "statuses")
+
+    def __init__(self, method: str, route: str):
+        self.method = method
+        self.route = route
+        self.duration = HTTP_REQUEST_SECONDS.labels(method, route)
+        self.size = HTTP_RESPONSE_BYTES.labels(method, route)
+        self.db = HTTP_REQUEST_DB_SECONDS.labels(method, route)
+        self.queries = HTTP_REQUEST_QUERIES.labels(method, route)
+        self.statuses: dict = {}
+
+    def count(self, status: int) -> None:
+        child = self.statuses.get(status)
+        if child is None:
+            child = self.statuses[status] = HTTP_REQUESTS.labels(self.method, self.route, status)
+        child.inc()
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self._in_flight = HTTP_IN_FLIGHT.labels()
+        # (method, route template) -> _RouteMetrics; bounded by the app's routes
+        self._routes: dict[tuple[str, str], _RouteMetrics] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        timings = RequestTimings(scope)
+        token = current_request_timings.set(timings)
+        status = 500
+        size = 0
+
+        async def send_with_metrics(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if SQL_DEBUG_HEADERS:
+                    message["headers"] = [
+                        *message.get("headers", ()),
+                        (b"x-db-query-count", str(timings.queries).encode()),
+                        (b"x-db-time-ms", f"{timings.db_seconds * 1000:.1f}".encode()),
+                    ]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        self._in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            elapsed = time.perf_counter() - started
+            self._in_flight.dec()
+            current_request_timings.reset(token)
+
+            key = (scope["method"], _route_label(scope))
+            metrics = self._routes.get(key)
+            if metrics is None:
+                metrics = self._routes[key] = _RouteMetrics(*key)
+            metrics.count(status)
+            metrics.duration.observe(elapsed)
+            metrics.size.observe(size)
+            metrics.db.observe(timings.db_seconds)
+            metrics.queries.observe(timings.queries)
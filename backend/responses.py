@@ -0,0 +1,58 @@
+"""
+JSON rendering for API responses.
+
+FastJSONResponse uses orjson when it is installed and falls back to the stdlib
+encoder (compact separators, no ASCII escaping) otherwise. Handlers on hot paths
+return it directly, which also skips FastAPI's jsonable_encoder pass.
+"""
+
+import datetime
+import enum
+import json
+from decimal import Decimal
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+def _json_default(value: Any):
+    # same conversions jsonable_encoder would have made
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if isinstance(value, bytes):
+        return value.decode("utf-8")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+
+    def dumps(content: Any) -> bytes:
+        return orjson.dumps(content, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+
+else:
+
+    def dumps(content: Any) -> bytes:
+        return json.dumps(
+            content,
+            default=_json_default,
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
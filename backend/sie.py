@@ -0,0 +1,399 @@
+"""
+Helpers for working with SIE content stored in CompanySIEState.
+
+The frontend (src/lib/sie.ts) writes one record per line and puts voucher
+blocks on their own lines:
+
+    #VER A 12 20240131 "Hyra januari"
+    {
+       #TRANS 5010 {} 8000.00
+       #TRANS 1930 {} -8000.00
+    }
+
+Everything here works on that line representation so that edits can be applied
+without understanding the full file.
+"""
+
+import difflib
+import gzip
+from dataclasses import dataclass, field
+import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Iterator
+
+
+class SIEPatchError(ValueError):
+    pass
+
+
+# ------------------------------------------------------------
+# Storage codecs
+# ------------------------------------------------------------
+# gzip is used (rather than raw zlib) so stored bytes can be sent as-is to
+# clients with "Content-Encoding: gzip".
+SIE_CODECS = ("gzip", "none")
+
+
+def compress_sie_content(content: str, codec: str = "gzip") -> bytes:
+    data = content.encode("utf-8")
+    if codec == "gzip":
+        # mtime=0 -> identical content gives identical bytes
+        return gzip.compress(data, compresslevel=6, mtime=0)
+    if codec == "none":
+        return data
+    raise ValueError(f"Unknown SIE codec: {codec}")
+
+
+def decompress_sie_content(data: bytes, codec: str) -> str:
+    # psycopg2 returns bytea as memoryview
+    data = bytes(data)
+    if codec == "gzip":
+        data = gzip.decompress(data)
+    elif codec != "none":
+        raise ValueError(f"Unknown SIE codec: {codec}")
+    return data.decode("utf-8")
+
+
+# ------------------------------------------------------------
+# Lines
+# ------------------------------------------------------------
+@dataclass
+class SIELines:
+    lines: list[str]
+    newline: str = "\n"
+    trailing_newline: bool = False
+
+    def render(self) -> str:
+        content = self.newline.join(self.lines)
+        if self.trailing_newline and self.lines:
+            content += self.newline
+        return content
+
+
+def split_sie_lines(content: str) -> SIELines:
+    newline = "\r\n" if "\r\n" in content else "\n"
+    trailing = content.endswith("\n")
+    lines = content.splitlines()
+    return SIELines(lines=lines, newline=newline, trailing_newline=trailing)
+
+
+def tokenize_sie_line(line: str) -> list[str]:
+    """
+    Split a SIE record into tokens. Quoted strings become one token (without quotes),
+    and a {...} object list becomes one token including its braces.
+    """
+    tokens: list[str] = []
+    i = 0
+    n = len(line)
+    while i < n:
+        ch = line[i]
+        if ch in " \t":
+            i += 1
+            continue
+        if ch == '"':
+            i += 1
+            buf = []
+            while i < n and line[i] != '"':
+                if line[i] == "\\" and i + 1 < n:
+                    i += 1
+                buf.append(line[i])
+                i += 1
+            tokens.append("".join(buf))
+            i += 1
+            continue
+        if ch == "{":
+            end = line.find("}", i)
+            if end < 0:
+                end = n - 1
+            tokens.append(line[i:end + 1])
+            i = end + 1
+            continue
+        start = i
+        while i < n and line[i] not in " \t":
+            i += 1
+        tokens.append(line[start:i])
+    return tokens
+
+
+# ------------------------------------------------------------
+# Vouchers
+# ------------------------------------------------------------
+def voucher_key(series: str, number: str) -> tuple[str, str]:
+    return (series.strip(), number.strip())
+
+
+def iter_voucher_blocks(lines: list[str]) -> Iterator[tuple[tuple[str, str], int, int]]:
+    """
+    Yield ((series, number), start, end) in file order, where lines[start:end] is
+    the full #VER header plus its { ... } block. Repeated keys are yielded again.
+    """
+    i = 0
+    n = len(lines)
+    while i < n:
+        stripped = lines[i].lstrip()
+        if not stripped.startswith("#VER"):
+            i += 1
+            continue
+        tokens = tokenize_sie_line(stripped)
+        if len(tokens) < 3 or tokens[0] != "#VER":
+            i += 1
+            continue
+        start = i
+        opened = tokens[-1].startswith("{") and not tokens[-1].endswith("}")
+        j = i + 1
+        if not opened:
+            # skip blank lines between header and opening brace
+            while j < n and not lines[j].strip():
+                j += 1
+            if j < n and lines[j].strip() == "{":
+                opened = True
+                j += 1
+        if opened:
+            while j < n and lines[j].strip() != "}":
+                j += 1
+            j = min(j + 1, n)
+        yield voucher_key(tokens[1], tokens[2]), start, j
+        i = j
+
+
+def find_voucher_blocks(lines: list[str]) -> dict[tuple[str, str], tuple[int, int]]:
+    """{(series, number): (start, end)}; for a repeated key the last block wins."""
+    return {key: (start, end) for key, start, end in iter_voucher_blocks(lines)}
+
+
+# ------------------------------------------------------------
+# Patches
+# ------------------------------------------------------------
+def apply_line_edits(lines: list[str], edits: list[dict]) -> list[str]:
+    """
+    Apply hunks of the form {"start": int, "delete": int, "insert": [str]}.
+    Positions refer to the ORIGINAL lines; hunks may not overlap.
+    """
+    ordered = sorted(edits, key=lambda e: e["start"])
+    prev_end = 0
+    for edit in ordered:
+        start = edit["start"]
+        delete = edit.get("delete", 0)
+        if start < 0 or delete < 0 or start + delete > len(lines):
+            raise SIEPatchError(f"Line edit out of range: start={start} delete={delete}")
+        if start < prev_end:
+            raise SIEPatchError(f"Overlapping line edits at line {start}")
+        prev_end = start + delete
+
+    out: list[str] = []
+    pos = 0
+    for edit in ordered:
+        start = edit["start"]
+        out.extend(lines[pos:start])
+        out.extend(edit.get("insert") or [])
+        pos = start + edit.get("delete", 0)
+    out.extend(lines[pos:])
+    return out
+
+
+def apply_voucher_edits(lines: list[str], edits: list[dict]) -> list[str]:
+    """
+    Apply voucher-level edits {"series": str, "number": str, "lines": [str] | None}.
+    - lines=None deletes the voucher
+    - an existing voucher is replaced in place
+    - a new voucher is appended at the end
+    Each voucher may be edited once per patch, and "lines" must be exactly that
+    voucher (#VER header with the same series/number plus its block).
+    """
+    blocks = find_voucher_blocks(lines)
+    replacements: dict[int, tuple[int, list[str]]] = {}
+    appended: list[str] = []
+    seen: set[tuple[str, str]] = set()
+
+    for edit in edits:
+        key = voucher_key(str(edit["series"]), str(edit["number"]))
+        if key in seen:
+            raise SIEPatchError(f"Voucher {key[0]} {key[1]} edited more than once")
+        seen.add(key)
+        new_lines = edit.get("lines")
+        if new_lines is not None:
+            new_blocks = find_voucher_blocks(new_lines)
+            if list(new_blocks) != [key] or new_blocks[key] != (0, len(new_lines)):
+                raise SIEPatchError(
+                    f"Lines for voucher {key[0]} {key[1]} must be a single #VER {key[0]} {key[1]} block"
+                )
+        if key in blocks:
+            start, end = blocks.pop(key)
+            replacements[start] = (end, new_lines or [])
+        elif new_lines is None:
+            raise SIEPatchError(f"Voucher {key[0]} {key[1]} not found")
+        else:
+            appended.extend(new_lines)
+
+    if not replacements:
+        return lines + appended
+
+    out: list[str] = []
+    i = 0
+    n = len(lines)
+    while i < n:
+        if i in replacements:
+            end, new_lines = replacements[i]
+            out.extend(new_lines)
+            i = end
+            continue
+        out.append(lines[i])
+        i += 1
+    out.extend(appended)
+    return out
+
+
+def apply_sie_patch(content: str, line_edits: list[dict], voucher_edits: list[dict]) -> str:
+    parsed = split_sie_lines(content)
+    lines = parsed.lines
+    if line_edits:
+        lines = apply_line_edits(lines, line_edits)
+    if voucher_edits:
+        lines = apply_voucher_edits(lines, voucher_edits)
+    parsed.lines = lines
+    return parsed.render()
+
+
+def diff_sie_lines(old: list[str], new: list[str]) -> list[dict]:
+    """
+    Line hunks (same shape as apply_line_edits) that turn old into new.
+    Common prefix/suffix are trimmed first so a typical single edit never
+    reaches difflib.
+    """
+    prefix = 0
+    limit = min(len(old), len(new))
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    limit -= prefix
+    while suffix < limit and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+
+    old_mid = old[prefix:len(old) - suffix]
+    new_mid = new[prefix:len(new) - suffix]
+    if not old_mid and not new_mid:
+        return []
+    if not old_mid or not new_mid:
+        return [{"start": prefix, "delete": len(old_mid), "insert": new_mid}]
+
+    hunks = []
+    matcher = difflib.SequenceMatcher(a=old_mid, b=new_mid)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        hunks.append({"start": prefix + i1, "delete": i2 - i1, "insert": new_mid[j1:j2]})
+    return hunks
+
+
+def diff_sie_content(old: str, new: str) -> list[dict] | None:
+    """
+    Line hunks turning old into new, or None when the change cannot be expressed
+    as line edits (newline style or trailing newline changed).
+    """
+    old_parsed = split_sie_lines(old)
+    new_parsed = split_sie_lines(new)
+    if (old_parsed.newline, old_parsed.trailing_newline) != (new_parsed.newline, new_parsed.trailing_newline):
+        return None
+    return diff_sie_lines(old_parsed.lines, new_parsed.lines)
+
+
+# ------------------------------------------------------------
+# Ledger parsing (vouchers, transactions, opening balances)
+# ------------------------------------------------------------
+@dataclass
+class SIETransaction:
+    account: str
+    amount: Decimal
+    objects: str = "{}"
+    date: datetime.date | None = None
+    text: str | None = None
+
+
+@dataclass
+class SIEVoucher:
+    series: str
+    number: str
+    date: datetime.date
+    text: str | None = None
+    transactions: list[SIETransaction] = field(default_factory=list)
+
+    @property
+    def key(self) -> tuple[str, str]:
+        return (self.series, self.number)
+
+
+@dataclass
+class SIELedger:
+    # year index (0 = current, -1 = previous, ...) -> (start, end)
+    years: dict[int, tuple[datetime.date, datetime.date]] = field(default_factory=dict)
+    # (year index, account) -> amount
+    opening_balances: dict[tuple[int, str], Decimal] = field(default_factory=dict)
+    vouchers: list[SIEVoucher] = field(default_factory=list)
+
+
+def parse_sie_date(value: str) -> datetime.date | None:
+    value = value.strip()
+    if len(value) != 8 or not value.isdigit():
+        return None
+    try:
+        return datetime.date(int(value[:4]), int(value[4:6]), int(value[6:8]))
+    except ValueError:
+        return None
+
+
+def parse_sie_ledger(content: str) -> SIELedger:
+    ledger = SIELedger()
+    current: SIEVoucher | None = None
+
+    for raw in content.splitlines():
+        line = raw.strip()
+        if not line.startswith("#"):
+            if line == "}":
+                current = None
+            continue
+
+        tokens = tokenize_sie_line(line)
+        tag = tokens[0]
+
+        if tag == "#TRANS":
+            if current is None or len(tokens) < 3:
+                continue
+            # #TRANS account {objects} amount [date] [text] [quantity] [sign]
+            try:
+                amount = Decimal(tokens[3] if tokens[2].startswith("{") else tokens[2])
+            except (InvalidOperation, IndexError):
+                continue
+            rest = tokens[4:] if tokens[2].startswith("{") else tokens[3:]
+            current.transactions.append(
+                SIETransaction(
+                    account=tokens[1],
+                    amount=amount,
+                    objects=tokens[2] if tokens[2].startswith("{") else "{}",
+                    date=parse_sie_date(rest[0]) if rest else None,
+                    text=rest[1] if len(rest) > 1 and rest[1] else None,
+                )
+            )
+        elif tag == "#VER":
+            current = None
+            if len(tokens) < 4:
+                continue
+            voucher_date = parse_sie_date(tokens[3])
+            if voucher_date is None:
+                continue
+            text_value = tokens[4] if len(tokens) > 4 and not tokens[4].startswith("{") else None
+            current = SIEVoucher(series=tokens[1], number=tokens[2], date=voucher_date, text=text_value or None)
+            ledger.vouchers.append(current)
+        elif tag == "#IB" and len(tokens) >= 4:
+            try:
+                ledger.opening_balances[(int(tokens[1]), tokens[2])] = Decimal(tokens[3])
+            except (ValueError, InvalidOperation):
+                continue
+        elif tag == "#RAR" and len(tokens) >= 4:
+            start, end = parse_sie_date(tokens[2]), parse_sie_date(tokens[3])
+            if start and end:
+                try:
+                    ledger.years[int(tokens[1])] = (start, end)
+                except ValueError:
+                    continue
+
+    return ledger
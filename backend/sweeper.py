@@ -0,0 +1,165 @@
+"""
+Periodic cleanup of expired company locks and lock takeover requests.
+
+Every worker runs an ExpirySweeper thread. On Postgres each batch first takes a
+transaction-scoped advisory lock, so when several uvicorn workers wake up at the
+same time only one of them does the work. Request handlers never delete or expire
+rows themselves; they just ignore rows whose expires_at has passed.
+"""
+
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, select, text, update
+from sqlalchemy.orm import Session
+
+from database import SWEEP_ADVISORY_LOCK
+from events import publish_company_event
+from models import CompanyLock, CompanyLockTakeoverRequest, CompanyLockTakeoverStatus
+
+logger = logging.getLogger("snug-api")
+
+SWEEP_INTERVAL_SECONDS = max(1, int(os.getenv("EXPIRY_SWEEP_INTERVAL_SECONDS", "30")))
+SWEEP_BATCH_SIZE = max(1, int(os.getenv("EXPIRY_SWEEP_BATCH_SIZE", "500")))
+# decided/expired takeover requests are kept this long for history, then deleted
+TAKEOVER_RETENTION_DAYS = max(0, int(os.getenv("TAKEOVER_RETENTION_DAYS", "7")))
+
+
+def _try_sweep_lock(db: Session) -> bool:
+    if db.get_bind().dialect.name != "postgresql":
+        return True
+    namespace, lock_id = SWEEP_ADVISORY_LOCK
+    return bool(
+        db.execute(
+            text("SELECT pg_try_advisory_xact_lock(:namespace, :lock_id)"), {"namespace": namespace, "lock_id": lock_id}
+        ).scalar()
+    )
+
+
+# The batch subqueries only pick candidates. Under READ COMMITTED, Postgres rechecks just
+# the outer WHERE against a row that another transaction changed meanwhile, so the
+# expiry conditions are repeated there: a lock extended or taken over by the upsert, or a
+# takeover request decided, after the batch was picked is left alone.
+def _expire_locks(db: Session, now: datetime, limit: int) -> int:
+    batch = select(CompanyLock.company_id).where(CompanyLock.expires_at <= now).limit(limit).scalar_subquery()
+    company_ids = db.execute(
+        delete(CompanyLock)
+        .where(CompanyLock.company_id.in_(batch), CompanyLock.expires_at <= now)
+        .returning(CompanyLock.company_id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    for company_id in company_ids:
+        publish_company_event(db, company_id, "lock", {"locked": False, "reason": "expired"})
+    return len(company_ids)
+
+
+def _expire_takeover_requests(db: Session, now: datetime, limit: int) -> int:
+    batch = (
+        select(CompanyLockTakeoverRequest.id)
+        .where(
+            CompanyLockTakeoverRequest.status == CompanyLockTakeoverStatus.PENDING,
+            CompanyLockTakeoverRequest.expires_at <= now,
+        )
+        .limit(limit)
+        .scalar_subquery()
+    )
+    rows = db.execute(
+        update(CompanyLockTakeoverRequest)
+        .where(
+            CompanyLockTakeoverRequest.id.in_(batch),
+            CompanyLockTakeoverRequest.status == CompanyLockTakeoverStatus.PENDING,
+            CompanyLockTakeoverRequest.expires_at <= now,
+        )
+        .values(status=CompanyLockTakeoverStatus.EXPIRED, decided_at=now)
+        .returning(
+            CompanyLockTakeoverRequest.id,
+            CompanyLockTakeoverRequest.company_id,
+            CompanyLockTakeoverRequest.requested_by_user_id,
+        )
+        .execution_options(synchronize_session=False)
+    ).all()
+    for row in rows:
+        publish_company_event(
+            db,
+            row.company_id,
+            "takeover",
+            {"action": "expired", "requestId": row.id, "requestedByUserId": row.requested_by_user_id},
+        )
+    return len(rows)
+
+
+def _purge_takeover_requests(db: Session, now: datetime, limit: int) -> int:
+    cutoff = now - timedelta(days=TAKEOVER_RETENTION_DAYS)
+    batch = (
+        select(CompanyLockTakeoverRequest.id)
+        .where(
+            CompanyLockTakeoverRequest.status != CompanyLockTakeoverStatus.PENDING,
+            func.coalesce(CompanyLockTakeoverRequest.decided_at, CompanyLockTakeoverRequest.expires_at) < cutoff,
+        )
+        .limit(limit)
+        .scalar_subquery()
+    )
+    result = db.execute(
+        delete(CompanyLockTakeoverRequest)
+        .where(CompanyLockTakeoverRequest.id.in_(batch))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount or 0
+
+
+def sweep_expired(db: Session, now: datetime | None = None, batch_size: int = SWEEP_BATCH_SIZE) -> dict | None:
+    """
+    Expire locks and takeover requests in batches, committing after each batch.
+    Returns counts, or None when another worker holds the sweep lock.
+    """
+    now = now or datetime.utcnow()
+    totals = {"locks": 0, "takeoverExpired": 0, "takeoverPurged": 0}
+    steps = (
+        ("locks", _expire_locks),
+        ("takeoverExpired", _expire_takeover_requests),
+        ("takeoverPurged", _purge_takeover_requests),
+    )
+    for key, step in steps:
+        while True:
+            if not _try_sweep_lock(db):
+                db.rollback()
+                return None
+            count = step(db, now, batch_size)
+            db.commit()
+            totals[key] += count
+            if count < batch_size:
+                break
+    return totals
+
+
+class ExpirySweeper:
+    def __init__(self, session_factory, interval_seconds: int = SWEEP_INTERVAL_SECONDS):
+        self._session_factory = session_factory
+        self._interval = interval_seconds
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="expiry-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            db = self._session_factory()
+            try:
+                totals = sweep_expired(db)
+                if totals and any(totals.values()):
+                    logger.info("Expiry sweep: %s", totals)
+            except Exception:
+                db.rollback()
+                logger.exception("Expiry sweep failed.")
+            finally:
+                db.close()
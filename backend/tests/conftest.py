@@ -0,0 +1,92 @@
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+from sqlalchemy import event
+
+# database.py reads DATABASE_URL at import time, so configure it before importing the app.
+# TEST_DATABASE_URL points the tests at a scratch Postgres database (its tables are dropped
+# and recreated); without it they run against a temporary sqlite file.
+_SQLITE_PATH = Path(tempfile.mkdtemp(prefix="snug-tests-")) / "test.db"
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL") or f"sqlite:///{_SQLITE_PATH}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ["MIGRATIONS_ON_STARTUP"] = "off"
+
+# the backend is run from its own directory, not installed; make its modules importable
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import database  # noqa: E402
+import main  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from membership_cache import membership_cache  # noqa: E402
+from models import Company, CompanyMember, User  # noqa: E402
+
+
+@pytest.fixture()
+def client():
+    database.Base.metadata.drop_all(database.engine)
+    database.Base.metadata.create_all(database.engine)
+    # ids restart with the tables; memberships cached by an earlier test would be stale
+    membership_cache.invalidate()
+    # entered as a context manager so every request runs on the same event loop
+    # (pooled asyncpg connections are bound to the loop that opened them)
+    with TestClient(main.app) as c:
+        yield c
+
+
+@pytest.fixture()
+def company(client):
+    """(company_id, owner_id, member_id): a company with two active members."""
+    db = database.SessionLocal()
+    try:
+        owner = User(email="owner@example.com", password="-", name="Owner")
+        member = User(email="member@example.com", password="-", name="Member")
+        company = Company(company_name="Test AB", organization_number="5560000000")
+        db.add_all([owner, member, company])
+        db.flush()
+        db.add_all(
+            [
+                CompanyMember(company_id=company.id, user_id=owner.id, role="OWNER"),
+                CompanyMember(company_id=company.id, user_id=member.id, role="MEMBER"),
+            ]
+        )
+        db.commit()
+        return company.id, owner.id, member.id
+    finally:
+        db.close()
+
+
+@pytest.fixture()
+def count_queries():
+    """
+    Context manager recording the statements executed on either engine inside it:
+
+        with count_queries() as statements:
+            client.get(...)
+        assert len(statements) == 2
+
+    The membership cache is cleared on entry, so the access check is always one of them.
+    """
+    statements: list[str] = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engines = (database.engine, database.async_engine.sync_engine)
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+
+    @contextmanager
+    def counting():
+        membership_cache.invalidate()
+        statements.clear()
+        yield statements
+
+    try:
+        yield counting
+    finally:
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
@@ -0,0 +1,60 @@
+SIE = """#RAR 0 20240101 20241231
+#RAR -1 20230101 20231231
+#IB -1 1930 500.00
+#IB 0 1930 1500.00
+#VER A 1 20230310 "Sale 2023"
+{
+   #TRANS 1930 {} 1000.00
+   #TRANS 3010 {} -1000.00
+}
+#VER A 2 20240115 "Sale 2024"
+{
+   #TRANS 1930 {} 250.00
+   #TRANS 3010 {} -250.00
+}
+#VER A 3 20240620 "Sale 2024"
+{
+   #TRANS 1930 {} 100.00
+   #TRANS 3010 {} -100.00
+}
+"""
+
+
+def _balance(client, company_id, user_id, account, to_date=None):
+    params = {"user_id": user_id}
+    if to_date:
+        params["to_date"] = to_date
+    r = client.get(f"/companies/{company_id}/ledger/accounts/{account}/balance", params=params)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def _save(client, company_id, user_id, content):
+    r = client.put(f"/companies/{company_id}/sie-state", json={"user_id": user_id, "sie_content": content})
+    assert r.status_code == 200, r.text
+
+
+def test_balance_covers_only_the_fiscal_year_of_to_date(client, company):
+    company_id, owner_id, _ = company
+    assert client.post(f"/companies/{company_id}/lock", json={"user_id": owner_id}).json()["success"]
+    _save(client, company_id, owner_id, SIE)
+
+    # result account: no IB, so only this year's transactions count
+    assert _balance(client, company_id, owner_id, "3010")["balance"] == "-350.00"
+    assert _balance(client, company_id, owner_id, "3010", "2024-03-31")["balance"] == "-250.00"
+    assert _balance(client, company_id, owner_id, "3010", "2023-12-31")["balance"] == "-1000.00"
+
+    # balance account: the year's IB plus its transactions
+    current = _balance(client, company_id, owner_id, "1930")
+    assert (current["openingBalance"], current["balance"]) == ("1500.00", "1850.00")
+    assert _balance(client, company_id, owner_id, "1930", "2023-06-30")["balance"] == "1500.00"
+
+    # an incremental save that adds a year moves the bound with it
+    _save(
+        client,
+        company_id,
+        owner_id,
+        SIE.replace("#RAR 0 20240101 20241231", "#RAR 0 20240101 20240331\n#RAR 1 20240401 20241231"),
+    )
+    assert _balance(client, company_id, owner_id, "3010")["balance"] == "-100.00"
+    assert _balance(client, company_id, owner_id, "3010", "2024-03-31")["balance"] == "-250.00"
@@ -0,0 +1,100 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import delete
+
+import database
+import main
+from models import CompanyLock
+
+THREADS = 16
+ROUNDS = 10
+
+
+def test_concurrent_lock_and_heartbeat_have_one_owner(client, company):
+    company_id, owner_id, member_id = company
+    start = threading.Barrier(THREADS)
+
+    def hammer(worker: int):
+        user_id = (owner_id, member_id)[worker % 2]
+        start.wait()
+        results = []
+        for i in range(ROUNDS):
+            path = "lock" if (worker + i) % 2 else "lock/heartbeat"
+            r = client.post(f"/companies/{company_id}/{path}", json={"user_id": user_id})
+            results.append((user_id, r.status_code, r.json()))
+        return results
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        responses = [r for results in pool.map(hammer, range(THREADS)) for r in results]
+
+    assert [(status, body) for _, status, body in responses if status != 200] == []
+
+    holders = {user_id for user_id, _, body in responses if body["success"]}
+    assert len(holders) == 1
+    (holder,) = holders
+
+    refused = [body for user_id, _, body in responses if not body["success"]]
+    assert refused, "the other user should have been refused"
+    assert {body["lockedBy"]["id"] for body in refused} == {holder}
+
+    # exactly one of the successful calls took the lock, the rest extended it
+    extended = ("alreadyOwned", "extended")
+    taken = [body for _, _, body in responses if body["success"] and not any(k in body for k in extended)]
+    assert len(taken) == 1
+
+    lock = client.get(f"/companies/{company_id}/lock", params={"user_id": owner_id}).json()
+    assert lock["locked"] and lock["lockedBy"]["id"] == holder
+
+
+def test_lock_released_after_refusal_is_taken(client, company, monkeypatch):
+    company_id, owner_id, member_id = company
+    assert client.post(f"/companies/{company_id}/lock", json={"user_id": owner_id}).json()["success"]
+
+    # the owner unlocks right after the member's upsert was refused
+    get_live_lock = main._get_live_lock_async
+
+    async def released_first(db, company_id):
+        with database.engine.begin() as conn:
+            conn.execute(delete(CompanyLock).where(CompanyLock.company_id == company_id))
+        monkeypatch.setattr(main, "_get_live_lock_async", get_live_lock)
+        return await get_live_lock(db, company_id)
+
+    for path in ("lock", "lock/heartbeat"):
+        assert client.post(f"/companies/{company_id}/unlock", json={"user_id": member_id}).status_code == 200
+        assert client.post(f"/companies/{company_id}/lock", json={"user_id": owner_id}).json()["success"]
+        monkeypatch.setattr(main, "_get_live_lock_async", released_first)
+
+        r = client.post(f"/companies/{company_id}/{path}", json={"user_id": member_id})
+        assert r.status_code == 200
+        assert r.json()["success"]
+        lock = client.get(f"/companies/{company_id}/lock", params={"user_id": owner_id}).json()
+        assert lock["lockedBy"]["id"] == member_id
+
+
+def test_lock_and_heartbeat_while_holder_unlocks(client, company):
+    company_id, owner_id, member_id = company
+    start = threading.Barrier(THREADS)
+
+    def hammer(worker: int):
+        start.wait()
+        results = []
+        for i in range(ROUNDS):
+            if worker % 2:
+                # the owner keeps taking and releasing the lock
+                path = "lock" if i % 2 else "unlock"
+                r = client.post(f"/companies/{company_id}/{path}", json={"user_id": owner_id})
+            else:
+                path = "lock" if (worker + i) % 4 else "lock/heartbeat"
+                r = client.post(f"/companies/{company_id}/{path}", json={"user_id": member_id})
+            results.append((r.status_code, r.json()))
+        return results
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        responses = [r for results in pool.map(hammer, range(THREADS)) for r in results]
+
+    assert [(status, body) for status, body in responses if status != 200] == []
+    for _, body in responses:
+        if not body["success"]:
+            # refused: either a named live holder, or nothing left to take
+            assert body["locked"] is False or body["lockedBy"]["id"] in (owner_id, member_id)
@@ -0,0 +1,11 @@
+import main
+
+
+def test_full_password_queue_answers_503_with_retry_after(client, monkeypatch):
+    monkeypatch.setattr(main.password_hasher, "workers", 0)
+    monkeypatch.setattr(main.password_hasher, "max_queue", 0)
+
+    r = client.post("/users", json={"email": "busy@example.com", "password": "secret", "name": "Busy"})
+    assert r.status_code == 503
+    assert r.headers["retry-after"] == "1"
+    assert r.json() == {"detail": "Too many concurrent password operations, try again shortly"}
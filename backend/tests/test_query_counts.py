@@ -0,0 +1,73 @@
+"""
+Statement budgets for the polling endpoints. Each one is the access check plus one
+query; related users are joined in, never lazy-loaded per row.
+"""
+
+from datetime import datetime, timedelta
+
+import database
+from models import CompanyLockTakeoverRequest, CompanyMember, User
+
+
+def _add_takeover_requests(company_id: int, first: int, count: int) -> None:
+    db = database.SessionLocal()
+    try:
+        for i in range(first, first + count):
+            user = User(email=f"requester{i}@example.com", password="-", name=f"Requester {i}")
+            db.add(user)
+            db.flush()
+            db.add(CompanyMember(company_id=company_id, user_id=user.id, role="MEMBER"))
+            db.add(
+                CompanyLockTakeoverRequest(
+                    company_id=company_id,
+                    requested_by_user_id=user.id,
+                    expires_at=datetime.utcnow() + timedelta(minutes=5),
+                )
+            )
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_list_takeover_requests_does_not_grow_with_requests(client, company, count_queries):
+    company_id, owner_id, _ = company
+    url = f"/companies/{company_id}/takeover-requests"
+    r = client.get(url, params={"user_id": owner_id})  # connect outside the count
+
+    for pending in (1, 5):
+        _add_takeover_requests(company_id, len(r.json()), pending - len(r.json()))
+        with count_queries() as statements:
+            r = client.get(url, params={"user_id": owner_id})
+        assert len(r.json()) == pending
+        assert len(statements) == 2, statements
+
+
+def test_get_company_lock(client, company, count_queries):
+    company_id, owner_id, member_id = company
+    url = f"/companies/{company_id}/lock"
+    assert client.post(url, json={"user_id": owner_id}).json()["success"]
+
+    with count_queries() as statements:
+        r = client.get(url, params={"user_id": member_id})
+    assert r.json()["lockedBy"]["email"] == "owner@example.com"
+    assert len(statements) == 2, statements
+
+
+def test_unlock_company_refused(client, company, count_queries):
+    company_id, owner_id, member_id = company
+    assert client.post(f"/companies/{company_id}/lock", json={"user_id": owner_id}).json()["success"]
+
+    with count_queries() as statements:
+        r = client.post(f"/companies/{company_id}/unlock", json={"user_id": member_id})
+    assert r.json()["lockedBy"]["email"] == "owner@example.com"
+    assert len(statements) == 2, statements
+
+
+def test_sie_state_write_refused_while_locked_by_another(client, company, count_queries):
+    company_id, owner_id, member_id = company
+    assert client.post(f"/companies/{company_id}/lock", json={"user_id": owner_id}).json()["success"]
+
+    with count_queries() as statements:
+        r = client.put(f"/companies/{company_id}/sie-state", json={"user_id": member_id, "sie_content": "#FLAGGA 0\n"})
+    assert r.status_code == 409
+    assert len(statements) == 2, statements
@@ -0,0 +1,108 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text, update
+
+import database
+from models import CompanyLock, CompanyLockTakeoverRequest, CompanyLockTakeoverStatus
+from sweeper import sweep_expired
+
+pytestmark = pytest.mark.skipif(
+    database.engine.dialect.name != "postgresql",
+    reason="needs row locks between concurrent transactions (set TEST_DATABASE_URL)",
+)
+
+
+def _sweep_racing(change) -> dict:
+    """
+    Run sweep_expired while another transaction holds `change` uncommitted, so the sweep
+    picks its batch from the old row and then waits on the row lock; commit the change
+    once the sweep is blocked and return the sweep's totals.
+    """
+    now = datetime.utcnow()
+    totals = {}
+    with database.engine.connect() as other:
+        other.execute(change)
+
+        def sweep():
+            db = database.SessionLocal()
+            try:
+                totals.update(sweep_expired(db, now=now))
+            finally:
+                db.close()
+
+        sweeper = threading.Thread(target=sweep)
+        sweeper.start()
+        deadline = time.monotonic() + 10
+        # autocommit: pg_stat_activity is snapshotted once per transaction
+        with database.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as monitor:
+            while not monitor.execute(
+                text("SELECT count(*) FROM pg_stat_activity WHERE wait_event_type = 'Lock' AND datname = current_database()")
+            ).scalar():
+                assert sweeper.is_alive(), f"sweep finished without waiting on the changed row: {totals}"
+                assert time.monotonic() < deadline, "sweep never blocked on the changed row"
+                time.sleep(0.01)
+        other.commit()
+        sweeper.join(10)
+    return totals
+
+
+def _insert(*rows) -> None:
+    db = database.SessionLocal()
+    try:
+        db.add_all(rows)
+        db.commit()
+        for row in rows:
+            db.refresh(row)
+        db.expunge_all()
+    finally:
+        db.close()
+
+
+def test_lock_extended_while_sweeping_is_kept(company):
+    company_id, owner_id, _ = company
+    _insert(
+        CompanyLock(
+            company_id=company_id,
+            locked_by_user_id=owner_id,
+            locked_at=datetime.utcnow() - timedelta(minutes=20),
+            expires_at=datetime.utcnow() - timedelta(minutes=1),
+        )
+    )
+    extended_until = datetime.utcnow() + timedelta(minutes=10)
+
+    totals = _sweep_racing(
+        update(CompanyLock).where(CompanyLock.company_id == company_id).values(expires_at=extended_until)
+    )
+
+    assert totals["locks"] == 0
+    db = database.SessionLocal()
+    try:
+        assert db.get(CompanyLock, company_id).expires_at == extended_until
+    finally:
+        db.close()
+
+
+def test_takeover_request_decided_while_sweeping_keeps_its_decision(company):
+    company_id, owner_id, member_id = company
+    request = CompanyLockTakeoverRequest(
+        company_id=company_id, requested_by_user_id=member_id, expires_at=datetime.utcnow() - timedelta(minutes=1)
+    )
+    _insert(request)
+
+    totals = _sweep_racing(
+        update(CompanyLockTakeoverRequest)
+        .where(CompanyLockTakeoverRequest.id == request.id)
+        .values(status=CompanyLockTakeoverStatus.APPROVED, decided_by_user_id=owner_id)
+    )
+
+    assert totals["takeoverExpired"] == 0
+    db = database.SessionLocal()
+    try:
+        decided = db.get(CompanyLockTakeoverRequest, request.id)
+        assert decided.status == CompanyLockTakeoverStatus.APPROVED
+        assert decided.decided_at is None
+    finally:
+        db.close()
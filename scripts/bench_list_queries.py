@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: ORM entity loads vs column-projected selects for the list endpoints.
+
+Seeds a throwaway database (sqlite by default, or BENCH_DATABASE_URL) and reports
+rows/second for the old query shape (full ORM entities + hand-built dicts) and the
+new one (labelled columns -> dicts) used by /customers, /products, /companies,
+/companies/for-user and /companies/{id}/members.
+
+    python scripts/bench_list_queries.py --rows 5000 --repeat 5
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND))
+
+_tmpdir = tempfile.mkdtemp(prefix="bench-list-")
+os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL", f"sqlite:///{_tmpdir}/bench.db")
+
+from sqlalchemy import insert, select  # noqa: E402
+
+import database  # noqa: E402
+from models import Company, CompanyMember, Customer, Product, User  # noqa: E402
+
+
+COMPANY_COLUMNS = (
+    Company.id,
+    Company.company_name.label("companyName"),
+    Company.organization_number.label("organizationNumber"),
+    Company.address,
+    Company.postal_code.label("postalCode"),
+    Company.city,
+    Company.country,
+    Company.vat_number.label("vatNumber"),
+    Company.fiscal_year_start.label("fiscalYearStart"),
+    Company.fiscal_year_end.label("fiscalYearEnd"),
+    Company.accounting_standard.label("accountingStandard"),
+)
+
+
+def company_dict(c):
+    return {
+        "id": c.id,
+        "companyName": c.company_name,
+        "organizationNumber": c.organization_number,
+        "address": c.address,
+        "postalCode": c.postal_code,
+        "city": c.city,
+        "country": c.country,
+        "vatNumber": c.vat_number,
+        "fiscalYearStart": c.fiscal_year_start,
+        "fiscalYearEnd": c.fiscal_year_end,
+        "accountingStandard": c.accounting_standard,
+    }
+
+
+def seed(db, rows: int) -> int:
+    user_id = db.execute(insert(User).returning(User.id), [{"email": "bench@example.com", "password": "x", "name": "Bench"}]).scalar_one()
+    db.execute(insert(User), [{"email": f"member{i}@example.com", "password": "x", "name": f"M{i}"} for i in range(rows)])
+    db.execute(
+        insert(Company),
+        [{"company_name": f"Bolag {i}", "organization_number": f"55{i:08d}", "city": "Stockholm", "country": "SE"} for i in range(rows)],
+    )
+    db.execute(insert(CompanyMember), [{"company_id": i + 1, "user_id": user_id, "role": "OWNER", "status": "ACTIVE"} for i in range(rows)])
+    db.execute(insert(CompanyMember), [{"company_id": 1, "user_id": user_id + i + 1, "role": "MEMBER", "status": "ACTIVE"} for i in range(rows)])
+    db.execute(
+        insert(Customer),
+        [
+            {"user_id": user_id, "company_id": 1, "type": "company", "name": f"Kund {i}", "address": "Gatan 1",
+             "postal_code": "11122", "city": "Stockholm", "country": "SE"}
+            for i in range(rows)
+        ],
+    )
+    db.execute(
+        insert(Product),
+        [{"user_id": user_id, "company_id": 1, "name": f"Vara {i}", "price": 100.0, "includes_vat": False, "vat_rate": 25} for i in range(rows)],
+    )
+    db.commit()
+    return user_id
+
+
+def cases(user_id: int):
+    """(endpoint, old, new) where each callable takes a session and returns a list of dicts."""
+    return [
+        (
+            "/customers",
+            lambda db: [
+                {"id": c.id, "user_id": c.user_id, "company_id": c.company_id, "type": c.type, "name": c.name,
+                 "organizationNumber": c.organization_number, "email": c.email, "phone": c.phone, "address": c.address,
+                 "postalCode": c.postal_code, "city": c.city, "country": c.country}
+                for c in db.query(Customer).filter(Customer.user_id == user_id).order_by(Customer.id)
+            ],
+            lambda db: [
+                dict(r) for r in db.execute(
+                    select(Customer.id, Customer.user_id, Customer.company_id, Customer.type, Customer.name,
+                           Customer.organization_number.label("organizationNumber"), Customer.email, Customer.phone,
+                           Customer.address, Customer.postal_code.label("postalCode"), Customer.city, Customer.country)
+                    .where(Customer.user_id == user_id).order_by(Customer.id)
+                ).mappings()
+            ],
+        ),
+        (
+            "/products",
+            lambda db: [
+                {"id": p.id, "user_id": p.user_id, "company_id": p.company_id, "name": p.name, "description": p.description,
+                 "price": p.price, "includesVat": p.includes_vat, "vatRate": p.vat_rate, "unit": p.unit}
+                for p in db.query(Product).filter(Product.user_id == user_id).order_by(Product.id)
+            ],
+            lambda db: [
+                dict(r) for r in db.execute(
+                    select(Product.id, Product.user_id, Product.company_id, Product.name, Product.description, Product.price,
+                           Product.includes_vat.label("includesVat"), Product.vat_rate.label("vatRate"), Product.unit)
+                    .where(Product.user_id == user_id).order_by(Product.id)
+                ).mappings()
+            ],
+        ),
+        (
+            "/companies",
+            lambda db: [
+                company_dict(c)
+                for c in db.query(Company).filter(
+                    Company.id.in_([m.company_id for m in db.query(CompanyMember).filter(
+                        CompanyMember.user_id == user_id, CompanyMember.status == "ACTIVE")])
+                )
+            ],
+            lambda db: [
+                dict(r) for r in db.execute(
+                    select(*COMPANY_COLUMNS)
+                    .join(CompanyMember, CompanyMember.company_id == Company.id)
+                    .where(CompanyMember.user_id == user_id, CompanyMember.status == "ACTIVE")
+                    .order_by(Company.id)
+                ).mappings()
+            ],
+        ),
+        (
+            "/companies/for-user",
+            lambda db: [
+                dict(company_dict(c), memberRole=m.role, memberStatus=m.status)
+                for c, m in db.query(Company, CompanyMember)
+                .join(CompanyMember, CompanyMember.company_id == Company.id)
+                .filter(CompanyMember.user_id == user_id, CompanyMember.status == "ACTIVE")
+                .order_by(Company.id)
+            ],
+            lambda db: [
+                dict(r) for r in db.execute(
+                    select(*COMPANY_COLUMNS, CompanyMember.role.label("memberRole"), CompanyMember.status.label("memberStatus"))
+                    .join(CompanyMember, CompanyMember.company_id == Company.id)
+                    .where(CompanyMember.user_id == user_id, CompanyMember.status == "ACTIVE")
+                    .order_by(Company.id)
+                ).mappings()
+            ],
+        ),
+        (
+            "/companies/{id}/members",
+            lambda db: [
+                {"userId": u.id, "email": u.email, "name": u.name, "role": m.role, "status": m.status}
+                for m, u in db.query(CompanyMember, User)
+                .join(User, User.id == CompanyMember.user_id)
+                .filter(CompanyMember.company_id == 1)
+                .order_by(CompanyMember.user_id)
+            ],
+            lambda db: [
+                dict(r) for r in db.execute(
+                    select(User.id.label("userId"), User.email, User.name, CompanyMember.role, CompanyMember.status)
+                    .join(User, User.id == CompanyMember.user_id)
+                    .where(CompanyMember.company_id == 1)
+                    .order_by(CompanyMember.user_id)
+                ).mappings()
+            ],
+        ),
+    ]
+
+
+def rows_per_second(fn, repeat: int) -> tuple[float, int]:
+    best = float("inf")
+    count = 0
+    for _ in range(repeat):
+        db = database.SessionLocal()
+        try:
+            start = time.perf_counter()
+            count = len(fn(db))
+            best = min(best, time.perf_counter() - start)
+        finally:
+            db.close()
+    return count / best, count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    database.Base.metadata.drop_all(database.engine)
+    database.Base.metadata.create_all(database.engine)
+    db = database.SessionLocal()
+    try:
+        user_id = seed(db, args.rows)
+    finally:
+        db.close()
+
+    print(f"{'endpoint':28} {'rows':>7} {'ORM rows/s':>12} {'projected rows/s':>17} {'speedup':>8}")
+    for name, old, new in cases(user_id):
+        old_rate, old_count = rows_per_second(old, args.repeat)
+        new_rate, new_count = rows_per_second(new, args.repeat)
+        assert old_count == new_count, name
+        print(f"{name:28} {new_count:>7} {old_rate:>12,.0f} {new_rate:>17,.0f} {new_rate / old_rate:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the polling endpoints (lock heartbeat, lock status,
+takeover-request poll, conditional sie-state) at high client concurrency.
+
+Against a running API this creates --companies throwaway users/companies, has each
+owner take its company lock, and then runs --clients concurrent clients for
+--seconds. Each client is pinned to one company and loops over:
+
+    POST /companies/{id}/lock/heartbeat
+    GET  /companies/{id}/lock
+    GET  /companies/{id}/takeover-requests
+    GET  /companies/{id}/sie-state            (If-None-Match -> 304)
+
+It prints requests/second and latency percentiles per endpoint.
+
+    pip install httpx
+    python scripts/bench_lock_endpoints.py --base-url http://localhost:8000 --clients 500 --seconds 20
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from collections import defaultdict
+
+import httpx
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+
+async def create_company(client: httpx.AsyncClient) -> tuple[int, int]:
+    email = f"bench-{uuid.uuid4().hex[:12]}@example.com"
+    r = await client.post("/users", json={"email": email, "password": uuid.uuid4().hex, "name": "Bench"})
+    r.raise_for_status()
+    user_id = r.json()["id"]
+    r = await client.post(
+        "/companies",
+        json={"user_id": user_id, "company_name": "Bench AB", "organization_number": uuid.uuid4().hex[:10]},
+    )
+    r.raise_for_status()
+    company_id = r.json()["id"]
+    (await client.post(f"/companies/{company_id}/lock", json={"user_id": user_id})).raise_for_status()
+    r = await client.put(f"/companies/{company_id}/sie-state", json={"user_id": user_id, "sie_content": "#FLAGGA 0\n"})
+    r.raise_for_status()
+    return company_id, user_id
+
+
+async def run_client(client, company_id, user_id, deadline, latencies, errors) -> None:
+    etag = None
+    while time.perf_counter() < deadline:
+        calls = [
+            ("heartbeat", client.post(f"/companies/{company_id}/lock/heartbeat", json={"user_id": user_id})),
+            ("lock", client.get(f"/companies/{company_id}/lock", params={"user_id": user_id})),
+            ("takeover-requests", client.get(f"/companies/{company_id}/takeover-requests", params={"user_id": user_id})),
+            (
+                "sie-state",
+                client.get(
+                    f"/companies/{company_id}/sie-state",
+                    params={"user_id": user_id},
+                    headers={"If-None-Match": etag} if etag else None,
+                ),
+            ),
+        ]
+        for name, call in calls:
+            started = time.perf_counter()
+            try:
+                r = await call
+            except httpx.HTTPError:
+                errors[name] += 1
+                continue
+            elapsed = time.perf_counter() - started
+            if r.status_code >= 400:
+                errors[name] += 1
+                continue
+            if name == "sie-state":
+                etag = r.headers.get("ETag", etag)
+            latencies[name].append(elapsed)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--companies", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=20)
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=120, limits=limits) as client:
+        companies = [await create_company(client) for _ in range(args.companies)]
+
+        latencies: dict[str, list[float]] = defaultdict(list)
+        errors: dict[str, int] = defaultdict(int)
+        started = time.perf_counter()
+        deadline = started + args.seconds
+        await asyncio.gather(
+            *(
+                run_client(client, *companies[i % len(companies)], deadline, latencies, errors)
+                for i in range(args.clients)
+            )
+        )
+        elapsed = time.perf_counter() - started
+
+        for company_id, user_id in companies:
+            await client.post(f"/companies/{company_id}/unlock", json={"user_id": user_id})
+
+    total = sum(len(v) for v in latencies.values())
+    print(f"{args.clients} clients, {elapsed:.1f} s: {total / elapsed:,.0f} req/s, {sum(errors.values())} errors")
+    print(f"{'endpoint':20} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, values in latencies.items():
+        ms = [v * 1000 for v in values]
+        print(
+            f"{name:20} {len(ms) / elapsed:>8,.0f} {percentile(ms, 50):>8.1f} {percentile(ms, 95):>8.1f} {percentile(ms, 99):>8.1f}"
+            + (f"  ({errors[name]} errors)" if errors[name] else "")
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
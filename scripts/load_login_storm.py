@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Load test: lock heartbeat latency during a login storm.
+
+Against a running API (docker compose, or uvicorn with any DATABASE_URL) this
+creates a throwaway user + company, takes the company lock, and then sends lock
+heartbeats at a steady rate, first on an idle API and then while --logins
+concurrent clients hammer POST /auth/login. It prints heartbeat p50/p95/p99/max
+for both phases, login throughput, and how many logins were shed with 503.
+
+    pip install httpx
+    python scripts/load_login_storm.py --base-url http://localhost:8000 --logins 200 --seconds 15
+
+With bcrypt in the API's request threadpool, heartbeat latency during the storm
+climbs to seconds; with the password process pool it should stay near baseline.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summary(label: str, latencies: list[float]) -> str:
+    ms = [v * 1000 for v in latencies]
+    return (
+        f"{label:10} n={len(ms):5}  p50={statistics.median(ms) if ms else float('nan'):8.1f} ms  "
+        f"p95={percentile(ms, 95):8.1f} ms  p99={percentile(ms, 99):8.1f} ms  max={max(ms, default=float('nan')):8.1f} ms"
+    )
+
+
+async def setup(client: httpx.AsyncClient, password: str) -> tuple[str, int, int]:
+    email = f"storm-{uuid.uuid4().hex[:12]}@example.com"
+    r = await client.post("/users", json={"email": email, "password": password, "name": "Login storm"})
+    r.raise_for_status()
+    user_id = r.json()["id"]
+    r = await client.post(
+        "/companies",
+        json={"user_id": user_id, "company_name": "Login storm AB", "organization_number": uuid.uuid4().hex[:10]},
+    )
+    r.raise_for_status()
+    company_id = r.json()["id"]
+    r = await client.post(f"/companies/{company_id}/lock", json={"user_id": user_id})
+    r.raise_for_status()
+    return email, user_id, company_id
+
+
+async def heartbeats(client: httpx.AsyncClient, company_id: int, user_id: int, interval: float, stop: asyncio.Event) -> list[float]:
+    latencies = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        r = await client.post(f"/companies/{company_id}/lock/heartbeat", json={"user_id": user_id})
+        r.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(max(0.0, interval - (time.perf_counter() - started)))
+    return latencies
+
+
+async def login_worker(client: httpx.AsyncClient, email: str, password: str, stop: asyncio.Event, counts: dict) -> None:
+    while not stop.is_set():
+        try:
+            r = await client.post("/auth/login", json={"email": email, "password": password})
+        except httpx.HTTPError:
+            counts["errors"] += 1
+            continue
+        if r.status_code == 503:
+            counts["shed"] += 1
+            await asyncio.sleep(float(r.headers.get("Retry-After", "1")))
+        elif r.status_code == 200 and r.json().get("success"):
+            counts["ok"] += 1
+        else:
+            counts["errors"] += 1
+
+
+async def phase(client, company_id, user_id, args, email=None, password=None) -> tuple[list[float], dict]:
+    stop = asyncio.Event()
+    counts = {"ok": 0, "shed": 0, "errors": 0}
+    beat = asyncio.create_task(heartbeats(client, company_id, user_id, args.heartbeat_interval, stop))
+    workers = []
+    if email:
+        workers = [asyncio.create_task(login_worker(client, email, password, stop, counts)) for _ in range(args.logins)]
+    await asyncio.sleep(args.seconds)
+    stop.set()
+    latencies = await beat
+    await asyncio.gather(*workers)
+    return latencies, counts
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--logins", type=int, default=200, help="concurrent login clients during the storm")
+    parser.add_argument("--seconds", type=float, default=15, help="duration of each phase")
+    parser.add_argument("--heartbeat-interval", type=float, default=0.1)
+    args = parser.parse_args()
+
+    password = "storm-" + uuid.uuid4().hex
+    limits = httpx.Limits(max_connections=args.logins + 10, max_keepalive_connections=args.logins + 10)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60, limits=limits) as client:
+        email, user_id, company_id = await setup(client, password)
+
+        idle, _ = await phase(client, company_id, user_id, args)
+        storm, counts = await phase(client, company_id, user_id, args, email, password)
+        await client.post(f"/companies/{company_id}/unlock", json={"user_id": user_id})
+
+    print(summary("idle", idle))
+    print(summary("storm", storm))
+    print(
+        f"logins: {counts['ok']} ok ({counts['ok'] / args.seconds:.1f}/s), "
+        f"{counts['shed']} shed with 503, {counts['errors']} errors"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -2,15 +2,18 @@
 from __future__ import annotations
 
 import argparse
+import heapq
 import json
 import re
 import sys
+from bisect import bisect_left, bisect_right
 from copy import deepcopy
 from dataclasses import dataclass, field
 from datetime import date
 from decimal import Decimal, ROUND_HALF_UP
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from sys import intern
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
 
 from docx import Document
 from docx.enum.section import WD_SECTION_START
@@ -25,6 +28,72 @@ from docx.text.paragraph import Paragraph
 ZERO = Decimal("0")
 
 
+class AccountIndex:
+    """Sorted account numbers with prefix sums, so a range sum is two binary searches."""
+
+    __slots__ = ("accounts", "prefix")
+
+    def __init__(self, year_data: Dict[int, Decimal]):
+        self.accounts = sorted(year_data)
+        prefix = [ZERO]
+        running = ZERO
+        for account in self.accounts:
+            running += year_data[account]
+            prefix.append(running)
+        self.prefix = prefix
+
+    def range_sum(self, start_acc: int, end_acc: int) -> Decimal:
+        lo = bisect_left(self.accounts, start_acc)
+        hi = bisect_right(self.accounts, end_acc)
+        if hi <= lo:
+            return ZERO
+        return self.prefix[hi] - self.prefix[lo]
+
+
+class YearBalances(dict):
+    """Account -> amount for one year. Builds its AccountIndex on the first range query
+    and drops it again on any mutation."""
+
+    __slots__ = ("_index",)
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._index: Optional[AccountIndex] = None
+
+    def __setitem__(self, key: int, value: Decimal) -> None:
+        self._index = None
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key: int) -> None:
+        self._index = None
+        super().__delitem__(key)
+
+    def clear(self) -> None:
+        self._index = None
+        super().clear()
+
+    def pop(self, *args: Any) -> Any:
+        self._index = None
+        return super().pop(*args)
+
+    def popitem(self) -> Any:
+        self._index = None
+        return super().popitem()
+
+    def setdefault(self, key: int, default: Any = None) -> Any:
+        self._index = None
+        return super().setdefault(key, default)
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        self._index = None
+        super().update(*args, **kwargs)
+
+    def range_sum(self, start_acc: int, end_acc: int) -> Decimal:
+        if self._index is None:
+            self._index = AccountIndex(self)
+        return self._index.range_sum(start_acc, end_acc)
+
+
 @dataclass
 class SieData:
     org_number: str = ""
@@ -36,6 +105,12 @@ class SieData:
     ib: Dict[int, Dict[int, Decimal]] = field(default_factory=dict)
     ub: Dict[int, Dict[int, Decimal]] = field(default_factory=dict)
     res: Dict[int, Dict[int, Decimal]] = field(default_factory=dict)
+    accounts: Dict[int, str] = field(default_factory=dict)
+    dimensions: Dict[int, str] = field(default_factory=dict)
+    objects: Dict[Tuple[int, str], str] = field(default_factory=dict)
+    # (year, period YYYYMM, account, objects) -> amount in öre
+    period_balances: Dict[Tuple[int, str, int, Tuple[Tuple[int, str], ...]], int] = field(default_factory=dict)
+    vouchers: List["SieVoucher"] = field(default_factory=list)
 
 
 @dataclass
@@ -67,34 +142,312 @@ def write_json(path: Path, data: Dict[str, Any]) -> None:
     path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
 
 
-def parse_sie(path: Path) -> SieData:
-    text = path.read_text(encoding="cp437")
-    data = SieData(ib={}, ub={}, res={})
+class SieOrgNumber(NamedTuple):
+    value: str
+
+    def apply(self, data: SieData) -> None:
+        data.org_number = self.value
+
+
+class SieCompanyName(NamedTuple):
+    value: str
+
+    def apply(self, data: SieData) -> None:
+        data.company_name = self.value
+
+
+class SieFiscalYear(NamedTuple):
+    year: int
+    start: str
+    end: str
+
+    def apply(self, data: SieData) -> None:
+        if self.year == 0:
+            data.current_start, data.current_end = self.start, self.end
+        elif self.year == -1:
+            data.prior_start, data.prior_end = self.start, self.end
+
+
+class SieBalance(NamedTuple):
+    kind: str  # "ib", "ub" or "res" (attribute name on SieData)
+    year: int
+    account: int
+    amount: Decimal
+
+    def apply(self, data: SieData) -> None:
+        balances = getattr(data, self.kind)
+        year_data = balances.get(self.year)
+        if year_data is None:
+            year_data = balances[self.year] = YearBalances()
+        year_data[self.account] = self.amount
+
+
+class SieAccount(NamedTuple):
+    account: int
+    name: str
+
+    def apply(self, data: SieData) -> None:
+        data.accounts[self.account] = self.name
+
+
+class SieDimension(NamedTuple):
+    dimension: int
+    name: str
+
+    def apply(self, data: SieData) -> None:
+        data.dimensions[self.dimension] = self.name
+
+
+class SieObject(NamedTuple):
+    dimension: int
+    object_id: str
+    name: str
+
+    def apply(self, data: SieData) -> None:
+        data.objects[(self.dimension, self.object_id)] = self.name
+
+
+class SiePeriodBalance(NamedTuple):
+    year: int
+    period: str
+    account: int
+    objects: Tuple[Tuple[int, str], ...]
+    amount_ore: int
+
+    def apply(self, data: SieData) -> None:
+        data.period_balances[(self.year, self.period, self.account, self.objects)] = self.amount_ore
+
+
+class SieTransaction(NamedTuple):
+    account: int
+    amount_ore: int
+    objects: Tuple[Tuple[int, str], ...] = ()
+    date: str = ""
+    text: str = ""
+
+    def apply(self, data: SieData) -> None:
+        # #TRANS only occurs inside a #VER block, so it belongs to the latest voucher
+        if data.vouchers:
+            data.vouchers[-1].transactions.append(self)
+
+
+class SieVoucher(NamedTuple):
+    series: str
+    number: str
+    date: str
+    text: str
+    transactions: List[SieTransaction]
+
+    def apply(self, data: SieData) -> None:
+        data.vouchers.append(self)
+
+
+_ACCOUNTS: Dict[str, int] = {}
+NO_OBJECTS: Tuple[Tuple[int, str], ...] = ()
+
+
+def intern_account(value: str) -> int:
+    """Account numbers repeat on every #TRANS line; share one int object per account."""
+    account = _ACCOUNTS.get(value)
+    if account is None:
+        account = _ACCOUNTS[value] = int(value)
+    return account
+
+
+def parse_ore(value: str) -> int:
+    """Parse a SIE amount ("-1234.5") into integer öre without going through Decimal."""
+    negative = value.startswith("-")
+    if negative or value.startswith("+"):
+        value = value[1:]
+    whole, _, frac = value.partition(".")
+    if len(frac) > 2:
+        ore = round_half_up_int(Decimal(value) * 100)
+    else:
+        ore = int(whole or "0") * 100 + int((frac + "00")[:2])
+    return -ore if negative else ore
+
+
+def ore_to_decimal(amount_ore: int) -> Decimal:
+    return Decimal(amount_ore).scaleb(-2)
+
+
+def split_sie_fields(rest: str) -> List[str]:
+    """Split the fields of a SIE record; quoted strings and {...} object lists are one field each."""
+    if '"' not in rest and "{" not in rest:
+        return rest.split()
+    fields: List[str] = []
+    i, n = 0, len(rest)
+    while i < n:
+        ch = rest[i]
+        if ch in " \t":
+            i += 1
+        elif ch == '"':
+            end = i + 1
+            buf = []
+            while end < n and rest[end] != '"':
+                if rest[end] == "\\" and end + 1 < n:
+                    end += 1
+                buf.append(rest[end])
+                end += 1
+            fields.append("".join(buf))
+            i = end + 1
+        elif ch == "{":
+            end = rest.find("}", i)
+            end = n if end < 0 else end + 1
+            fields.append(rest[i:end])
+            i = end
+        else:
+            end = i
+            while end < n and rest[end] not in " \t":
+                end += 1
+            fields.append(rest[i:end])
+            i = end
+    return fields
+
+
+def parse_object_list(value: str) -> Tuple[Tuple[int, str], ...]:
+    inner = value.strip()[1:-1].strip()
+    if not inner:
+        return NO_OBJECTS
+    parts = split_sie_fields(inner)
+    return tuple((int(parts[i]), intern(parts[i + 1])) for i in range(0, len(parts) - 1, 2))
+
+
+def _sie_date(value: str) -> str:
+    return intern(format_sie_date(value)) if value else ""
 
-    for line in text.splitlines():
-        if line.startswith("#ORGNR "):
-            data.org_number = line.split(maxsplit=1)[1].strip()
-        elif line.startswith("#FNAMN "):
-            match = re.search(r'"(.*)"', line)
-            data.company_name = match.group(1) if match else line.split(maxsplit=1)[1].strip()
-        elif line.startswith("#RAR 0 "):
-            _, _, start, end = line.split(maxsplit=3)
-            data.current_start = format_sie_date(start)
-            data.current_end = format_sie_date(end)
-        elif line.startswith("#RAR -1 "):
-            _, _, start, end = line.split(maxsplit=3)
-            data.prior_start = format_sie_date(start)
-            data.prior_end = format_sie_date(end)
-        elif line.startswith("#IB "):
-            _, year, account, amount = line.split(maxsplit=3)
-            data.ib.setdefault(int(year), {})[int(account)] = Decimal(amount)
-        elif line.startswith("#UB "):
-            _, year, account, amount = line.split(maxsplit=3)
-            data.ub.setdefault(int(year), {})[int(account)] = Decimal(amount)
-        elif line.startswith("#RES "):
-            _, year, account, amount = line.split(maxsplit=3)
-            data.res.setdefault(int(year), {})[int(account)] = Decimal(amount)
 
+def _parse_orgnr(rest: str) -> SieOrgNumber:
+    return SieOrgNumber(rest.strip())
+
+
+def _parse_fnamn(rest: str) -> SieCompanyName:
+    match = re.search(r'"(.*)"', rest)
+    return SieCompanyName(match.group(1) if match else rest.strip())
+
+
+def _parse_rar(rest: str) -> Optional[SieFiscalYear]:
+    fields = rest.split()
+    if len(fields) < 3 or fields[0] not in {"0", "-1"}:
+        return None
+    return SieFiscalYear(int(fields[0]), format_sie_date(fields[1]), format_sie_date(fields[2]))
+
+
+def _balance_parser(kind: str) -> Callable[[str], SieBalance]:
+    def parse(rest: str) -> SieBalance:
+        year, account, amount = rest.split()[:3]
+        return SieBalance(kind, int(year), int(account), Decimal(amount))
+
+    return parse
+
+
+def _parse_konto(rest: str) -> Optional[SieAccount]:
+    fields = split_sie_fields(rest)
+    if len(fields) < 2:
+        return None
+    return SieAccount(intern_account(fields[0]), fields[1])
+
+
+def _parse_dim(rest: str) -> Optional[SieDimension]:
+    fields = split_sie_fields(rest)
+    if len(fields) < 2:
+        return None
+    return SieDimension(int(fields[0]), fields[1])
+
+
+def _parse_objekt(rest: str) -> Optional[SieObject]:
+    fields = split_sie_fields(rest)
+    if len(fields) < 3:
+        return None
+    return SieObject(int(fields[0]), intern(fields[1]), fields[2])
+
+
+def _parse_psaldo(rest: str) -> Optional[SiePeriodBalance]:
+    # #PSALDO årsnr period konto {objekt} saldo [kvantitet]
+    fields = split_sie_fields(rest)
+    if len(fields) < 5:
+        return None
+    return SiePeriodBalance(
+        int(fields[0]),
+        intern(fields[1]),
+        intern_account(fields[2]),
+        parse_object_list(fields[3]),
+        parse_ore(fields[4]),
+    )
+
+
+def _parse_ver(rest: str) -> Optional[SieVoucher]:
+    # #VER serie vernr verdatum [vertext] [regdatum] [sign]
+    fields = split_sie_fields(rest)
+    if len(fields) < 3:
+        return None
+    text = fields[3] if len(fields) > 3 and not fields[3].startswith("{") else ""
+    return SieVoucher(intern(fields[0]), fields[1], _sie_date(fields[2]), text, [])
+
+
+def _parse_trans(rest: str) -> Optional[SieTransaction]:
+    # #TRANS kontonr {objektlista} belopp [transdat] [transtext] [kvantitet] [sign]
+    if '"' not in rest and rest.count("{") == 1 and "{}" in rest:
+        # fast path for the common "#TRANS 1930 {} -100.00 [20240116]" shape; anything
+        # after the date (an unquoted text, quantity) goes through the tokenizer below
+        fields = rest.split()
+        if len(fields) < 3:
+            return None
+        if len(fields) <= 4:
+            return SieTransaction(intern_account(fields[0]), parse_ore(fields[2]), NO_OBJECTS, _sie_date(fields[3]) if len(fields) > 3 else "")
+    fields = split_sie_fields(rest)
+    if len(fields) < 3:
+        return None
+    return SieTransaction(
+        intern_account(fields[0]),
+        parse_ore(fields[2]),
+        parse_object_list(fields[1]) if fields[1].startswith("{") else NO_OBJECTS,
+        _sie_date(fields[3]) if len(fields) > 3 else "",
+        fields[4] if len(fields) > 4 else "",
+    )
+
+
+SIE_RECORD_PARSERS: Dict[str, Callable[[str], Any]] = {
+    "#ORGNR": _parse_orgnr,
+    "#FNAMN": _parse_fnamn,
+    "#RAR": _parse_rar,
+    "#IB": _balance_parser("ib"),
+    "#UB": _balance_parser("ub"),
+    "#RES": _balance_parser("res"),
+    "#KONTO": _parse_konto,
+    "#DIM": _parse_dim,
+    "#OBJEKT": _parse_objekt,
+    "#PSALDO": _parse_psaldo,
+    "#VER": _parse_ver,
+    "#TRANS": _parse_trans,
+}
+
+
+def iter_sie_records(path: Path, encoding: str = "cp437") -> Iterator[Any]:
+    """Stream typed records from a SIE file.
+
+    The file is read through a buffered handle one line at a time (never the whole
+    text at once) and each line is dispatched on its tag via SIE_RECORD_PARSERS.
+    """
+    parsers = SIE_RECORD_PARSERS
+    with path.open("r", encoding=encoding, newline=None) as handle:
+        for line in handle:
+            line = line.strip()
+            if not line.startswith("#"):
+                continue
+            tag, _, rest = line.partition(" ")
+            parser = parsers.get(tag)
+            if parser is None or not rest:
+                continue
+            record = parser(rest)
+            if record is not None:
+                yield record
+
+
+def parse_sie(path: Path) -> SieData:
+    data = SieData(ib={}, ub={}, res={})
+    for record in iter_sie_records(path):
+        record.apply(data)
     return data
 
 
@@ -176,10 +529,39 @@ def sum_accounts(source: Dict[int, Dict[int, Decimal]], year: int, accounts: Lis
 
 def sum_account_range(source: Dict[int, Dict[int, Decimal]], year: int, start_acc: int, end_acc: int) -> Decimal:
     year_data = source.get(year, {})
+    if isinstance(year_data, YearBalances):
+        return year_data.range_sum(start_acc, end_acc)
     return sum((amount for acc, amount in year_data.items() if start_acc <= acc <= end_acc), start=ZERO)
 
 
 
+def transaction_totals_ore(sie: SieData, start: str = "", end: str = "") -> Dict[int, int]:
+    totals: Dict[int, int] = {}
+    for voucher in sie.vouchers:
+        if (start and voucher.date < start) or (end and voucher.date > end):
+            continue
+        for trans in voucher.transactions:
+            totals[trans.account] = totals.get(trans.account, 0) + trans.amount_ore
+    return totals
+
+
+
+def reconcile_transactions(sie: SieData) -> List[int]:
+    """Accounts where the current-year vouchers do not add up to UB - IB (balance) or RES (result)."""
+    movements = transaction_totals_ore(sie, sie.current_start, sie.current_end)
+    ib, ub, res = sie.ib.get(0, {}), sie.ub.get(0, {}), sie.res.get(0, {})
+    mismatched = []
+    for account in sorted(set(movements) | set(ub) | set(res)):
+        if account < 3000:
+            expected = ub.get(account, ZERO) - ib.get(account, ZERO)
+        else:
+            expected = res.get(account, ZERO)
+        if round_half_up_int(expected * 100) != movements.get(account, 0):
+            mismatched.append(account)
+    return mismatched
+
+
+
 def to_positive(value: Decimal) -> Decimal:
     return abs(value)
 
@@ -206,27 +588,29 @@ def round_with_target(values: Dict[str, Decimal], mode: str, target_total: Optio
             "rounding_diff_from_individual": 0,
         }
 
-    def adjustment_cost(name: str, step: int) -> Decimal:
-        value = values[name]
-        current = Decimal(rounded[name])
-        new = Decimal(rounded[name] + step)
-        return abs(new - value) - abs(current - value)
-
-    names = list(values.keys())
     step = 1 if diff > 0 else -1
+
+    def candidate(name: str) -> Optional[tuple]:
+        value = values[name]
+        current = rounded[name]
+        if step < 0 and current <= 0 and value >= 0:
+            return None
+        cost = abs(Decimal(current + step) - value) - abs(Decimal(current) - value)
+        frac = value - Decimal(int(value))
+        return (cost, -abs(value), -frac, name)
+
+    # Only the row that was just adjusted changes its cost, so a heap gives the
+    # same picks as re-sorting every candidate on each step.
+    heap = [entry for entry in (candidate(name) for name in values) if entry is not None]
+    heapq.heapify(heap)
     for _ in range(abs(diff)):
-        candidates = []
-        for name in names:
-            if step < 0 and rounded[name] <= 0 and values[name] >= 0:
-                continue
-            cost = adjustment_cost(name, step)
-            frac = values[name] - Decimal(int(values[name]))
-            candidates.append((cost, -abs(values[name]), -frac, name))
-        if not candidates:
+        if not heap:
             raise ValueError("Kunde inte balansera avrundningen med givna värden.")
-        candidates.sort()
-        chosen = candidates[0][3]
+        chosen = heapq.heappop(heap)[3]
         rounded[chosen] += step
+        entry = candidate(chosen)
+        if entry is not None:
+            heapq.heappush(heap, entry)
 
     return {
         "rounded": rounded,
@@ -1819,6 +2203,14 @@ def validate_rules(sie: SieData, manual: Dict[str, Any], built: BuiltValues) ->
     if abs(sum_accounts(sie.res, 0, [8423])) > ZERO or abs(sum_accounts(sie.res, -1, [8423])) > ZERO:
         infos.append("Scriptet lägger in en separat not om räntekostnader till koncernföretag när konto 8423 används.")
 
+    if sie.vouchers:
+        mismatched = reconcile_transactions(sie)
+        if mismatched:
+            shown = ", ".join(str(acc) for acc in mismatched[:10]) + (" …" if len(mismatched) > 10 else "")
+            warnings.append(f"Verifikationerna i SIE-filen stämmer inte med IB/UB/RES för {len(mismatched)} konton ({shown}).")
+        else:
+            infos.append(f"Verifikationerna i SIE-filen ({len(sie.vouchers)} st) stämmer med IB/UB/RES för räkenskapsåret.")
+
     varied_years = analyze_net_sales_variation(manual, built)
     if varied_years and not str(manual.get("net_sales_variation_comment", "")).strip():
         warnings.append("Nettoomsättningen varierar mer än 30 procent mellan år i flerårsöversikten (" + ", ".join(varied_years) + "). K2 kräver kommentar.")
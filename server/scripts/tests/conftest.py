@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# the scripts are run directly, not installed; make them importable as modules
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
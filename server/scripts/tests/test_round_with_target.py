@@ -0,0 +1,107 @@
+"""
+round_with_target keeps candidates in a heap; it must pick exactly the rows the
+original re-sort-every-step implementation picked. _reference_round_with_target
+below is that implementation, kept verbatim as the oracle.
+
+    pip install pytest python-docx
+    python -m pytest server/scripts/tests
+"""
+
+import random
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+import pytest
+
+from generate_arsredovisning_from_sie_v7 import ZERO, round_int_by_mode, round_with_target
+
+
+def _reference_round_with_target(values: Dict[str, Decimal], mode: str, target_total: Optional[int] = None) -> Dict[str, Any]:
+    if target_total is None:
+        target_total = round_int_by_mode(sum(values.values(), start=ZERO), mode)
+
+    rounded = {name: round_int_by_mode(value, mode) for name, value in values.items()}
+    current_total = sum(rounded.values())
+    diff = target_total - current_total
+
+    if diff == 0:
+        return {
+            "rounded": rounded,
+            "target_total": target_total,
+            "rounding_diff_from_individual": 0,
+        }
+
+    def adjustment_cost(name: str, step: int) -> Decimal:
+        value = values[name]
+        current = Decimal(rounded[name])
+        new = Decimal(rounded[name] + step)
+        return abs(new - value) - abs(current - value)
+
+    names = list(values.keys())
+    step = 1 if diff > 0 else -1
+    for _ in range(abs(diff)):
+        candidates = []
+        for name in names:
+            if step < 0 and rounded[name] <= 0 and values[name] >= 0:
+                continue
+            cost = adjustment_cost(name, step)
+            frac = values[name] - Decimal(int(values[name]))
+            candidates.append((cost, -abs(values[name]), -frac, name))
+        if not candidates:
+            raise ValueError("Kunde inte balansera avrundningen med givna värden.")
+        candidates.sort()
+        chosen = candidates[0][3]
+        rounded[chosen] += step
+
+    return {
+        "rounded": rounded,
+        "target_total": target_total,
+        "rounding_diff_from_individual": diff,
+    }
+
+
+def _random_values(rnd: random.Random) -> Dict[str, Decimal]:
+    count = rnd.randint(1, 25)
+    values = {}
+    for i in range(count):
+        kind = rnd.random()
+        if kind < 0.2:
+            # exact halves and ties between rows are where the tie-breaking matters
+            value = Decimal(rnd.randint(-20, 20)) + Decimal("0.5")
+        elif kind < 0.3:
+            value = Decimal(rnd.randint(-3, 3))
+        elif kind < 0.45 and values:
+            # mirror of an earlier row: same cost and size, only the sign breaks the tie
+            value = -values[rnd.choice(list(values))]
+        else:
+            value = Decimal(rnd.randint(-10_000_000, 10_000_000)) / 100
+        values[f"row{i:02d}"] = value
+    return values
+
+
+def _outcome(fn, values, mode, target):
+    try:
+        return fn(dict(values), mode, target)
+    except ValueError as exc:
+        return ("error", str(exc))
+
+
+@pytest.mark.parametrize("mode", ["half_up", "truncate"])
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_reference_implementation(mode, seed):
+    rnd = random.Random(seed)
+    for _ in range(150):
+        values = _random_values(rnd)
+        natural = round_int_by_mode(sum(values.values(), start=ZERO), mode)
+        target = rnd.choice([None, natural, natural + rnd.randint(-len(values) * 2, len(values) * 2)])
+        assert _outcome(round_with_target, values, mode, target) == _outcome(
+            _reference_round_with_target, values, mode, target
+        ), (values, mode, target)
+
+
+def test_unbalanceable_target_raises_like_reference():
+    values = {"a": Decimal("0.2"), "b": Decimal("0.1")}
+    with pytest.raises(ValueError):
+        _reference_round_with_target(values, "half_up", -5)
+    with pytest.raises(ValueError):
+        round_with_target(values, "half_up", -5)
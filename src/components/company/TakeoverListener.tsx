@@ -2,6 +2,8 @@
 import { useEffect, useRef, useState } from "react";
 import { toast } from "sonner";
 
+import { useCompanyEvents } from "@/hooks/useCompanyEvents";
+
 import {
   AlertDialog,
   AlertDialogAction,
@@ -37,7 +39,7 @@ function pickFirstRequest(payload: TakeoverListResponse): TakeoverRequestRow | n
 export function TakeoverListener(props: {
   companyId: number | string;
   userId: number;
-  pollMs?: number; // default 2000
+  pollMs?: number; // fallback poll while the event stream is down, default 2000
   enabled?: boolean; // default true
   onApproved?: () => void;
 }) {
@@ -103,16 +105,15 @@ export function TakeoverListener(props: {
     }
   }
 
-  useEffect(() => {
-    if (!enabled || !companyId) return;
-
-    // initial fetch + interval
-    fetchTakeoverRequests();
-    const t = setInterval(fetchTakeoverRequests, pollMs);
-
-    return () => clearInterval(t);
-    // eslint-disable-next-line react-hooks/exhaustive-deps
-  }, [enabled, companyId, userId, pollMs]);
+  // pushed via /events; pollMs is only used while the stream is down
+  useCompanyEvents(
+    companyId,
+    userId,
+    (event) => {
+      if (event !== "lock") fetchTakeoverRequests();
+    },
+    { enabled, fallbackPollMs: pollMs }
+  );
 
   async function approve() {
     if (!req) return;
@@ -1,7 +1,8 @@
-import { useEffect, useState } from "react"
+import { useState } from "react"
 import { Button } from "@/components/ui/button"
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card"
 import { toast } from "sonner"
+import { useCompanyEvents } from "@/hooks/useCompanyEvents"
 
 const API_BASE_URL =
   (import.meta as any).env?.VITE_API_BASE_URL ?? "http://localhost:8000"
@@ -40,11 +41,9 @@ export function TakeoverPopup({ companyId, userId }: Props) {
     }
   }
 
-  useEffect(() => {
-    loadRequests()
-    const i = setInterval(loadRequests, 2000)
-    return () => clearInterval(i)
-  }, [companyId, userId])
+  useCompanyEvents(companyId, userId, (event) => {
+    if (event !== "lock") loadRequests()
+  })
 
   const approve = async (id: number) => {
     setLoading(true)
@@ -1,7 +1,7 @@
 // src/contexts/AuthContext.tsx
 import { createContext, useContext, useState, useEffect, useRef, ReactNode } from 'react';
 import { authService, User } from '@/services/auth';
-import { unlockCompany } from "@/lib/api";
+import { fetchAllPages, unlockCompany } from "@/lib/api";
 
 export type { User } from '@/services/auth';
 
@@ -223,8 +223,7 @@ export function AuthProvider({ children }: { children: ReactNode }) {
       }
 
       if (authService.isDatabaseConnected()) {
-        fetch(API_BASE_URL + '/companies?user_id=' + parsedUser.id)
-          .then((response) => response.json())
+        fetchAllPages('/companies?user_id=' + parsedUser.id)
           .then((payload) => {
             const apiCompanies = Array.isArray(payload) ? payload.map(mapCompanyFromApi) : [];
             setCompanies(apiCompanies);
@@ -271,8 +270,7 @@ export function AuthProvider({ children }: { children: ReactNode }) {
 
     if (authService.isDatabaseConnected()) {
       try {
-        const response = await fetch(API_BASE_URL + '/companies?user_id=' + newUser.id);
-        const payload = await response.json().catch(() => []);
+        const payload = await fetchAllPages('/companies?user_id=' + newUser.id).catch(() => []);
         const apiCompanies = Array.isArray(payload) ? payload.map(mapCompanyFromApi) : [];
 
         if (apiCompanies.length > 0) {
@@ -462,8 +460,7 @@ export function AuthProvider({ children }: { children: ReactNode }) {
       throw new Error(created?.detail || created?.error || 'Failed to create company');
     }
 
-    const listRes = await fetch(API_BASE_URL + '/companies?user_id=' + newUser.id);
-    const listPayload = await listRes.json().catch(() => []);
+    const listPayload = await fetchAllPages('/companies?user_id=' + newUser.id).catch(() => []);
     const apiCompanies = Array.isArray(listPayload) ? listPayload.map(mapCompanyFromApi) : [];
 
     setCompanies(apiCompanies);
@@ -3,6 +3,7 @@ import { Customer, Product, Invoice, VoucherTemplate } from "@/lib/billing/types
 import { useAuth } from "./AuthContext";
 import { authService } from "@/services/auth";
 import { shouldUseLocalStorageMode } from "@/lib/runtimeMode";
+import { fetchAllPages } from "@/lib/api";
 
 interface BillingContextType {
   customers: Customer[];
@@ -108,8 +109,7 @@ export function BillingProvider({ children }: { children: ReactNode }) {
     setFirstInvoiceNumberSet(storedFirstSet === "1");
 
     if (shouldUseDatabase && user && hasNumericCompanyId) {
-      fetch(`${API_BASE_URL}/customers?user_id=${user.id}&company_id=${parsedCompanyId}`)
-        .then((response) => response.json())
+      fetchAllPages(`/customers?user_id=${user.id}&company_id=${parsedCompanyId}`)
         .then((payload) => {
           if (!isCurrentEffect) {
             return;
@@ -123,8 +123,7 @@ export function BillingProvider({ children }: { children: ReactNode }) {
           }
         });
 
-      fetch(`${API_BASE_URL}/products?user_id=${user.id}&company_id=${parsedCompanyId}`)
-        .then((response) => response.json())
+      fetchAllPages(`/products?user_id=${user.id}&company_id=${parsedCompanyId}`)
         .then((payload) => {
           if (!isCurrentEffect) {
             return;
@@ -0,0 +1,76 @@
+import { useEffect, useRef } from "react";
+
+const API_BASE =
+  ((import.meta as any).env?.VITE_API_BASE_URL || "http://localhost:8000").replace(/\/+$/, "");
+
+export type CompanyEventName = "ready" | "lock" | "takeover";
+
+/**
+ * Subscribe to /companies/{id}/events (server-sent events) and call onEvent for
+ * every lock/takeover change. While the stream is down (or EventSource is not
+ * available) onEvent is called every fallbackPollMs instead, so callers can keep
+ * using their existing fetch as the source of truth.
+ */
+export function useCompanyEvents(
+  companyId: number | string | null | undefined,
+  userId: number | null | undefined,
+  onEvent: (event: CompanyEventName, data: any) => void,
+  options?: { enabled?: boolean; fallbackPollMs?: number }
+) {
+  const enabled = options?.enabled !== false;
+  const fallbackPollMs = options?.fallbackPollMs ?? 2000;
+
+  const onEventRef = useRef(onEvent);
+  onEventRef.current = onEvent;
+
+  useEffect(() => {
+    if (!enabled || !companyId || !userId) return;
+
+    let pollTimer: ReturnType<typeof setInterval> | null = null;
+    const startPolling = () => {
+      if (pollTimer) return;
+      pollTimer = setInterval(() => onEventRef.current("ready", null), fallbackPollMs);
+    };
+    const stopPolling = () => {
+      if (!pollTimer) return;
+      clearInterval(pollTimer);
+      pollTimer = null;
+    };
+
+    if (typeof EventSource === "undefined") {
+      onEventRef.current("ready", null);
+      startPolling();
+      return stopPolling;
+    }
+
+    const query = new URLSearchParams({ user_id: String(userId) });
+    const source = new EventSource(API_BASE + "/companies/" + companyId + "/events?" + query.toString());
+
+    const handle = (name: CompanyEventName) => (e: MessageEvent) => {
+      let data: any = null;
+      try {
+        data = JSON.parse(e.data);
+      } catch {
+        // ignore malformed payloads
+      }
+      onEventRef.current(name, data);
+    };
+
+    // "ready" is sent on every (re)connect, so callers refetch anything missed
+    source.addEventListener("ready", (e) => {
+      stopPolling();
+      handle("ready")(e as MessageEvent);
+    });
+    source.addEventListener("lock", handle("lock") as EventListener);
+    source.addEventListener("takeover", handle("takeover") as EventListener);
+    source.onerror = () => {
+      // EventSource reconnects by itself; poll until it does
+      startPolling();
+    };
+
+    return () => {
+      source.close();
+      stopPolling();
+    };
+  }, [enabled, companyId, userId, fallbackPollMs]);
+}
@@ -54,6 +54,22 @@ export const api = {
   del: <T = any>(path: string) => apiRequest<T>(path, { method: 'DELETE' }),
 };
 
+// ---- Paginated lists ----
+// List endpoints return {items, nextCursor}; follow the cursor until every page is loaded.
+export async function fetchAllPages<T = any>(path: string, pageSize = 500): Promise<T[]> {
+  const items: T[] = [];
+  let cursor: string | null = null;
+  do {
+    const query = new URLSearchParams({ limit: String(pageSize) });
+    if (cursor) query.set('cursor', cursor);
+    const page: any = await api.get(path + (path.includes('?') ? '&' : '?') + query.toString());
+    if (Array.isArray(page)) return page;
+    items.push(...((page && page.items) || []));
+    cursor = (page && page.nextCursor) || null;
+  } while (cursor);
+  return items;
+}
+
 // ---- Auth ----
 export async function login(email: string, password: string) {
   return api.post('/auth/login', { email, password });
@@ -61,7 +77,7 @@ export async function login(email: string, password: string) {
 
 // ---- Companies ----
 export async function listCompanies(userId: number) {
-  return api.get('/companies?user_id=' + userId);
+  return fetchAllPages('/companies?user_id=' + userId);
 }
 
 // lock / unlock (backend verkar redan stödja detta)
@@ -69,6 +85,13 @@ export async function lockCompany(companyId: number | string, userId: number | s
   return api.post('/companies/' + companyId + '/lock', { user_id: Number(userId) });
 }
 
+// lock status for many companies at once (company list)
+export async function listCompanyLocks(userId: number | string, companyIds?: Array<number | string>) {
+  const query = new URLSearchParams({ user_id: String(Number(userId)) });
+  (companyIds || []).forEach((id) => query.append('company_ids', String(Number(id))));
+  return api.get('/companies/locks?' + query.toString());
+}
+
 // takeover (lock)
 export async function createTakeoverRequest(companyId: number | string, userId: number | string) {
   return api.post('/companies/' + companyId + '/takeover-request', {
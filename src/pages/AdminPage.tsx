@@ -4,6 +4,7 @@ import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
 import { Button } from "@/components/ui/button";
 import { useNavigate } from "react-router-dom";
 import { Shield } from "lucide-react";
+import { fetchAllPages } from "@/lib/api";
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from "@/components/ui/select";
 
 interface AdminUser {
@@ -32,11 +33,7 @@ export default function AdminPage() {
 
     const loadUsers = async () => {
       try {
-        const response = await fetch(`${apiBaseUrl}/users`);
-        if (!response.ok) {
-          throw new Error("Failed to load users");
-        }
-        const payload = await response.json();
+        const payload = await fetchAllPages("/users");
         setUsers(payload);
       } catch (err) {
         setError("Unable to load users from the API.");
@@ -1,4 +1,5 @@
 import { IAuthRepository, AuthCredentials, SignupData, AuthResult, User } from "./types";
+import { fetchAllPages } from "@/lib/api";
 
 const apiBaseUrl = import.meta.env.VITE_API_BASE_URL ?? "http://localhost:8000";
 
@@ -46,9 +47,8 @@ export class DatabaseAuthRepository implements IAuthRepository {
   }
 
   async getUserById(id: string): Promise<User | null> {
-    const response = await fetch(`${apiBaseUrl}/users`);
-    const payload = await response.json().catch(() => []);
-    if (!response.ok) {
+    const payload = await fetchAllPages<User>("/users").catch(() => null);
+    if (!payload) {
       return null;
     }
     return payload.find((user: User) => String(user.id) === String(id)) ?? null;